@@ -1,5 +1,6 @@
 from flask import Flask
 from database import init_db
+from game_store import create_game_store
 import json
 
 app = Flask(__name__)
@@ -18,6 +19,11 @@ PROLIFIC_COMPLETION_URL = app.config['PROLIFIC_COMPLETION_URL']
 # Initialize database
 init_db()
 
+# Server-side storage for the games in progress, referenced by a game id in the session
+game_store = create_game_store(app.config['GAME_STORE'],
+                               max_games=app.config['GAME_STORE_MAX_GAMES'],
+                               ttl=app.config['GAME_STORE_TTL'])
+
 # Import routes
 from routes import *
 
@@ -0,0 +1,156 @@
+from game_logic import Game
+from game_solver import Solver
+from brute_force import BruteForceSolver
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from collections import deque
+import itertools
+import os
+import numpy as np
+
+# number of arrays per game in a chunk's shared memory block:
+# game board, game state, final game state and reasoning steps
+ARRAYS_PER_GAME = 4
+
+
+def chunk_layout(shapes):
+    """
+    Offsets (in elements) of the games of a chunk in its shared memory block. All arrays are
+    stored as int16, each game as ARRAYS_PER_GAME consecutive (length, width) arrays.
+    """
+    sizes = [ARRAYS_PER_GAME * length * width for length, width in shapes]
+    offsets = [0] + list(itertools.accumulate(sizes))
+    return [(offset, length, width) for offset, (length, width) in zip(offsets, shapes)], offsets[-1]
+
+
+def game_arrays(buffer, offset, length, width):
+    """ Views of the board, state, final state and reasoning steps of one game in a chunk's block. """
+    size = length * width
+    block = np.ndarray((ARRAYS_PER_GAME * size,), dtype=np.int16, buffer=buffer, offset=2 * offset)
+    return block.reshape((ARRAYS_PER_GAME, length, width))
+
+
+def solve_game(game, solver_type='naive', max_steps=10, use_contradiction=True, **kwargs):
+    """
+    Solve a single game in place with the given solver type ('naive', 'sat' or 'brute_force').
+
+    Returns:
+    - np.ndarray: The reasoning steps matrix (see Solver.naive_solver).
+    """
+    if solver_type == 'brute_force':
+        return BruteForceSolver(game).solve(max_steps)
+    return Solver(solver_type).solve(game, max_steps, use_contradiction, **kwargs)
+
+
+def solve_chunk(shm_name, layout, solver_type, max_steps, use_contradiction, kwargs):
+    """
+    Worker function: solve the games of a chunk, reading the boards and states from the shared
+    memory block and writing the final states and reasoning steps back into it.
+    """
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        for offset, length, width in layout:
+            board, state, final_state, steps = game_arrays(shm.buf, offset, length, width)
+            game = Game(game_board=board.astype(int),
+                        game_states=[{'move': None, 'game_state': state.astype(int)}])
+            steps[:] = solve_game(game, solver_type, max_steps, use_contradiction, **kwargs)
+            final_state[:] = game.current_game_state
+            del board, state, final_state, steps
+    finally:
+        shm.close()
+    return len(layout)
+
+
+def iter_solve_games(games, solver_type='naive', max_steps=10, use_contradiction=True,
+                     max_workers=None, chunk_size=64, **kwargs):
+    """
+    Solve many games in parallel, yielding the results in the order of the input.
+
+    The games are read lazily in chunks of chunk_size. The boards and current states of a
+    chunk are copied into one shared memory block, so only the block's name and the shapes
+    of the games are sent to the worker process, which writes the final states and reasoning
+    steps back into the same block. At most two chunks per worker are in flight at a time.
+
+    The games themselves are not modified.
+
+    Parameters:
+    - games (iterable): Game objects.
+    - solver_type (str): 'naive', 'sat' or 'brute_force'.
+    - max_steps (int): Maximum number of solver steps per game.
+    - use_contradiction (bool): Whether to use contradiction testing (not used by 'brute_force').
+    - max_workers (int): Number of worker processes (default: number of CPUs).
+    - chunk_size (int): Number of games sent to a worker at a time.
+    - **kwargs: Passed on to Solver.solve.
+
+    Yields:
+    - (reasoning_steps_matrix, final_game_state) per game.
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    games = iter(games)
+
+    def submit(executor, chunk):
+        layout, size = chunk_layout([game.current_game_state.shape for game in chunk])
+        shm = shared_memory.SharedMemory(create=True, size=max(2 * size, 1))
+        for game, (offset, length, width) in zip(chunk, layout):
+            board, state, _, _ = game_arrays(shm.buf, offset, length, width)
+            board[:] = game.game_board
+            state[:] = game.current_game_state
+            del board, state
+        future = executor.submit(solve_chunk, shm.name, layout, solver_type, max_steps, use_contradiction, kwargs)
+        return future, shm, layout
+
+    def collect(future, shm, layout):
+        try:
+            future.result()
+            results = []
+            for offset, length, width in layout:
+                arrays = game_arrays(shm.buf, offset, length, width)
+                results.append((arrays[3].astype(int), arrays[2].astype(int)))
+                del arrays
+            return results
+        finally:
+            shm.close()
+            shm.unlink()
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        pending = deque()
+        try:
+            for chunk in iter(lambda: list(itertools.islice(games, chunk_size)), []):
+                pending.append(submit(executor, chunk))
+                if len(pending) >= 2 * max_workers:
+                    yield from collect(*pending.popleft())
+            while pending:
+                yield from collect(*pending.popleft())
+        finally:
+            # release the blocks of chunks that were not collected (error or generator closed early)
+            for future, shm, _ in pending:
+                future.cancel()
+                shm.close()
+                shm.unlink()
+
+
+def solve_games(games, solver_type='naive', max_steps=10, use_contradiction=True,
+                max_workers=None, chunk_size=64, **kwargs):
+    """
+    Solve many games in parallel (see iter_solve_games).
+
+    Returns:
+    - reasoning_steps_matrices (list): Reasoning steps matrix per game, in input order.
+    - final_game_states (list): Game state after solving per game, in input order.
+    """
+    results = list(iter_solve_games(games, solver_type, max_steps, use_contradiction,
+                                    max_workers, chunk_size, **kwargs))
+    return [steps for steps, _ in results], [state for _, state in results]
+
+
+if __name__ == "__main__":
+    # TESTING
+    np.random.seed(0)
+    games = []
+    for _ in range(200):
+        game = Game(length=10, width=10, num_mines=15)
+        game.make_random_move(10)
+        games.append(game)
+
+    reasoning_steps_matrices, final_game_states = solve_games(games, solver_type='naive')
+    print(sum(np.sum(state == -1) for state in final_game_states), "squares left undecided")
@@ -0,0 +1,129 @@
+import numpy as np
+
+
+def popcount(mask):
+    """ Number of set bits in an integer mask. """
+    return bin(mask).count('1')
+
+
+def iterate_bits(mask):
+    """ Yield the indices of the set bits of an integer mask, lowest first. """
+    while mask:
+        low_bit = mask & -mask
+        yield low_bit.bit_length() - 1
+        mask ^= low_bit
+
+
+class BitBoard:
+    """
+    Bitmask representation of a Minesweeper game state for solver hot paths.
+
+    Every set of squares is a single Python integer in which bit x * width + y stands for
+    square (x, y), so set operations are bitwise operations and neighbour counts are a
+    popcount of a mask and-ed with the square's precomputed neighbour mask.
+
+    Masks (game state encoding in brackets):
+    - unknown: unexplored squares (-1)
+    - flagged: flagged squares (-3)
+    - safe: squares marked as safe (-4)
+    - revealed: uncovered, numbered squares (0 to 8), with their numbers kept in numbers
+    - mines: squares revealed to contain a mine (-2)
+    - probes: probe locations (-5)
+    """
+
+    def __init__(self, length, width):
+        self.length = length
+        self.width = width
+        self.num_bytes = (length * width + 7) // 8
+        self.unknown = 0
+        self.flagged = 0
+        self.safe = 0
+        self.revealed = 0
+        self.mines = 0
+        self.probes = 0
+        self.numbers = np.zeros(length * width, dtype=np.int8)
+        self.neighbour_masks = self.get_neighbour_masks(length, width)
+
+    @staticmethod
+    def get_neighbour_masks(length, width):
+        """ Precompute, for every square, the mask of its (up to 8) adjacent squares. """
+        neighbour_masks = []
+        for x in range(length):
+            for y in range(width):
+                mask = 0
+                for nx in range(max(x - 1, 0), min(x + 2, length)):
+                    for ny in range(max(y - 1, 0), min(y + 2, width)):
+                        if (nx, ny) != (x, y):
+                            mask |= 1 << (nx * width + ny)
+                neighbour_masks.append(mask)
+        return neighbour_masks
+
+    @classmethod
+    def from_game_state(cls, game_state):
+        """ Build a BitBoard from the integer array encoding of a game state. """
+        game_state = np.asarray(game_state)
+        bitboard = cls(*game_state.shape)
+        bitboard.unknown = bitboard.to_mask(game_state == -1)
+        bitboard.flagged = bitboard.to_mask(game_state == -3)
+        bitboard.safe = bitboard.to_mask(game_state == -4)
+        bitboard.revealed = bitboard.to_mask(game_state >= 0)
+        bitboard.mines = bitboard.to_mask(game_state == -2)
+        bitboard.probes = bitboard.to_mask(game_state == -5)
+        bitboard.numbers = np.maximum(game_state, 0).reshape(-1).astype(np.int8)
+        return bitboard
+
+    def to_game_state(self):
+        """ Convert back to the integer array encoding of a game state. """
+        game_state = np.full(self.length * self.width, -1)
+        game_state[self.to_array(self.flagged)] = -3
+        game_state[self.to_array(self.safe)] = -4
+        game_state[self.to_array(self.mines)] = -2
+        game_state[self.to_array(self.probes)] = -5
+        revealed = self.to_array(self.revealed)
+        game_state[revealed] = self.numbers[revealed]
+        return game_state.reshape((self.length, self.width))
+
+    def to_mask(self, array):
+        """ Convert a boolean (length, width) array into an integer mask. """
+        bits = np.zeros(8 * self.num_bytes, dtype=bool)
+        bits[8 * self.num_bytes - self.length * self.width:] = np.asarray(array, dtype=bool).reshape(-1)[::-1]
+        return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+    def to_array(self, mask):
+        """ Convert an integer mask into a flat boolean array over all squares. """
+        bits = np.unpackbits(np.frombuffer(mask.to_bytes(self.num_bytes, 'big'), dtype=np.uint8))
+        return bits[8 * self.num_bytes - self.length * self.width:][::-1].astype(bool)
+
+    def bit(self, x, y):
+        return 1 << (x * self.width + y)
+
+    def cells(self, mask):
+        """ List the (x, y) coordinates of the squares in a mask, in row-major order. """
+        return [divmod(i, self.width) for i in iterate_bits(mask)]
+
+    def count_adjacent(self, mask, x, y):
+        """ Count the squares of mask adjacent to (x, y). """
+        return popcount(mask & self.neighbour_masks[x * self.width + y])
+
+    def unaccounted_mines(self, x, y):
+        """ Number shown at (x, y) minus the adjacent flags. """
+        return int(self.numbers[x * self.width + y]) - self.count_adjacent(self.flagged, x, y)
+
+    def frontier(self):
+        """ Mask of unexplored squares adjacent to a square with a number greater than zero. """
+        numbered = 0
+        for i in iterate_bits(self.revealed):
+            if self.numbers[i] > 0:
+                numbered |= self.neighbour_masks[i]
+        return numbered & self.unknown
+
+    def is_consistent(self, mine_mask):
+        """
+        Check whether placing mines on mine_mask (in addition to the flags) matches the
+        number of every revealed square.
+        """
+        mines = mine_mask | self.flagged
+        for i in iterate_bits(self.revealed):
+            if popcount(mines & self.neighbour_masks[i]) != self.numbers[i]:
+                return False
+        return True
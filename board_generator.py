@@ -0,0 +1,150 @@
+from game_logic import Game, board_from_mines, generate_boards, neighbourhood_sum
+from game_solver import Solver
+import numpy as np
+import random
+import time
+
+
+def solve_from_first_click(game_board, first_click, game_state=None, deadline=None, steps_per_round=10):
+    """
+    Play a board by pure deduction: open the first click, then repeatedly run the solver
+    and open every cell it proves to be safe, until no further deductions are possible.
+
+    Parameters:
+    - game_board (np.ndarray): The board to play.
+    - first_click (tuple): Coordinates (x, y) of the first query.
+    - game_state (np.ndarray): Optional state to resume from instead of the first click,
+      e.g. a previous result after a local change to the board (see forget_deductions).
+    - deadline (float): time.time() after which to stop, None for no limit. It is checked
+      between rounds of at most steps_per_round solver steps.
+    - steps_per_round (int): Maximum number of solver steps between opening safe squares.
+
+    Returns:
+    - Game: The game in its final state. The board is solvable without guessing
+      if no unexplored (-1) squares remain (unless the deadline was reached first).
+    """
+    game = Game(game_board=game_board, game_states=[])
+    if game_state is None:
+        game.move(first_click[0], first_click[1], 0)
+    else:
+        game.current_game_state = game_state.copy()
+    solver = Solver('naive')
+
+    while deadline is None or time.time() <= deadline:
+        previous_state = game.current_game_state.copy()
+        solver.solve(game, max_steps=steps_per_round)
+
+        # once all mines are flagged, every remaining square is safe, and if the remaining
+        # squares are as many as the remaining mines, they are all mines
+        unflagged_mines = game.num_mines - np.sum(game.current_game_state == -3)
+        if unflagged_mines == 0:
+            game.current_game_state[game.current_game_state == -1] = -4
+        elif unflagged_mines == np.sum(game.current_game_state == -1):
+            game.current_game_state[game.current_game_state == -1] = -3
+            continue
+
+        safe_squares = np.argwhere(game.current_game_state == -4)
+        if len(safe_squares) == 0:
+            if np.array_equal(game.current_game_state, previous_state):
+                return game
+            continue
+
+        # open the squares proved to be safe to reveal their numbers
+        for x, y in safe_squares:
+            game.current_game_state[x, y] = -1
+            game.reveal(x, y)
+    return game
+
+
+def forget_deductions(game_state, game_board, changed_squares, radius=2):
+    """
+    Update a deduction state after the mines on changed_squares were moved: revealed squares
+    get their new numbers (or become unexplored if they now hold a mine), and flags and safe
+    marks within radius of a changed square, which may have relied on the old numbers, are removed.
+    """
+    game_state = game_state.copy()
+    near = np.zeros(game_state.shape, dtype=bool)
+    for x, y in changed_squares:
+        near[max(x - radius, 0):x + radius + 1, max(y - radius, 0):y + radius + 1] = True
+    game_state[near & ((game_state == -3) | (game_state == -4))] = -1
+    revealed = game_state >= 0
+    game_state[revealed] = game_board[revealed]
+    return game_state
+
+
+def generate_no_guess_board(length, width, num_mines, first_click, max_iterations=None, seed=None,
+                            time_limit=None):
+    """
+    Generate a board that can be solved from first_click without guessing.
+
+    Instead of sampling boards until one happens to be solvable, a single board with a safe
+    opening around first_click is repaired: whenever deduction gets stuck, a mine on the
+    unresolved frontier is swapped with a safe square away from the revealed area
+    (or a frontier safe square with a mine elsewhere).
+
+    After a swap, deduction resumes from the previous state with the deductions near the
+    swapped squares forgotten, instead of replaying the whole board. Deductions further away
+    could still depend on the old numbers, so a board that looks solved this way is verified
+    once from the first click before it is returned.
+
+    Parameters:
+    - length, width (int): Board dimensions.
+    - num_mines (int): Number of mines.
+    - first_click (tuple): Coordinates (x, y) of the first query. The 3x3 area around it never contains mines.
+    - max_iterations (int): Maximum number of repairs, defaults to the number of squares on the board.
+    - seed (int): Seed for the random generator. If None, the global random state is used.
+    - time_limit (float): Maximum number of seconds to spend, None for no limit. The deadline is
+      also checked within the solver rounds, so it is overrun by at most one round.
+
+    Returns:
+    - np.ndarray: The int8 game board.
+
+    Raises ValueError if no board is found within max_iterations repairs or time_limit seconds.
+    """
+    deadline = None if time_limit is None else time.time() + time_limit
+    boards, mine_matrices = generate_boards(1, length, width, num_mines, seed=seed, first_click=first_click)
+    mine_matrix = mine_matrices[0]
+    rng = random if seed is None else random.Random(seed)
+    max_iterations = length * width if max_iterations is None else max_iterations
+
+    x, y = first_click
+    opening = np.zeros((length, width), dtype=bool)
+    opening[max(x - 1, 0):x + 2, max(y - 1, 0):y + 2] = True
+
+    game_state = None  # deduction state to resume from, None to start from the first click
+    for _ in range(max_iterations + 1):
+        game_board = board_from_mines(mine_matrix)
+        resumed = game_state is not None
+        game_state = solve_from_first_click(game_board, first_click, game_state, deadline).current_game_state
+        if not (game_state == -1).any():
+            # verify a resumed result from scratch, and repair from there if it does not hold
+            if resumed:
+                game_state = solve_from_first_click(game_board, first_click, deadline=deadline).current_game_state
+            if not (game_state == -1).any():
+                return game_board
+        if deadline is not None and time.time() > deadline:
+            break
+        unexplored = game_state == -1
+
+        # unresolved squares next to revealed numbers, and unexplored squares away from them
+        revealed = game_state >= 0
+        frontier = unexplored & (neighbourhood_sum(revealed) > 0)
+        interior = unexplored & ~frontier & ~opening
+        if not frontier.any():
+            frontier = unexplored
+
+        # swap a frontier square with a square of the other kind, preferring the interior, and
+        # otherwise any square outside the opening (a revealed square that gets a mine becomes
+        # unexplored again, since mines are -1 on the board)
+        fx, fy = rng.choice(list(zip(*np.nonzero(frontier))))
+        other_kind = ~mine_matrix if mine_matrix[fx, fy] else mine_matrix
+        candidates = interior & other_kind
+        if not candidates.any():
+            candidates = ~frontier & ~opening & other_kind
+        if not candidates.any():
+            break
+        cx, cy = rng.choice(list(zip(*np.nonzero(candidates))))
+        mine_matrix[fx, fy], mine_matrix[cx, cy] = mine_matrix[cx, cy], mine_matrix[fx, fy]
+        game_state = forget_deductions(game_state, board_from_mines(mine_matrix), [(fx, fy), (cx, cy)])
+
+    raise ValueError("Could not generate a board without guessing within the iteration or time limit")
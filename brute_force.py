@@ -1,88 +1,157 @@
 from game_logic import Game
 from game_solver import Solver
+from bitboard import BitBoard, iterate_bits, popcount
+from frontier import count_configurations, consistent_rows, CHUNK_SIZE
 import numpy as np
 import random
 import itertools
 import copy
 
 class BruteForceSolver(Solver):
-    def __init__(self, game):
-        super().__init__(solver_type='brute_force')
+    def __init__(self, game, cache=None):
+        super().__init__(solver_type='brute_force', cache=cache)
         self.game = game
+        # bitboard of the game state, and the (state array, number of moves) it was built for
+        self.cached_bitboard = None
+        self.cached_bitboard_version = None
+
+    @property
+    def bitboard(self):
+        """
+        BitBoard of the game's current state. It is rebuilt after every move made through
+        game.move, when the state array is replaced, and after make_deductions, so the
+        helpers never see a stale one. Changes written into the state array directly are not
+        noticed; call invalidate_bitboard after making them.
+        """
+        version = (self.game.current_game_state, len(self.game.game_states))
+        if (self.cached_bitboard is None or version[0] is not self.cached_bitboard_version[0]
+                or version[1] != self.cached_bitboard_version[1]):
+            self.cached_bitboard = BitBoard.from_game_state(self.game.current_game_state)
+            self.cached_bitboard_version = version
+        return self.cached_bitboard
+
+    def invalidate_bitboard(self):
+        """ Rebuild the bitboard on its next use. """
+        self.cached_bitboard = None
 
     def solve(self, max_steps=10):
+        """
+        Run the naive solver, then deduce the squares that are mines or safe in all
+        configurations consistent with the game state. Squares only deduced by the latter
+        get the step after the last naive step.
+
+        Returns:
+        - np.ndarray: The reasoning steps matrix (see Solver.naive_solver).
+        """
+        return self.cached_solve(self.game, (max_steps,), lambda: self.brute_force_solver(max_steps))
+
+    def brute_force_solver(self, max_steps):
         # Run naive solver first 
-        super().solve(self.game, max_steps)
+        reasoning_steps_matrix = self.naive_solver(self.game, max_steps, use_contradiction=True)
 
         #self.game.print_game()
-        candidate_cells = self.get_candidate_cells()
         remaining_mines = self.game.num_mines - self.get_flagged_mines_count()
 
-        all_combinations = itertools.combinations(candidate_cells, remaining_mines)
-
-        # Filter combinations for those consistent with the current game state
-        consistent_combinations = self.filter_consistent_combinations(all_combinations)
+        # Count the configurations consistent with the current game state, enumerating each
+        # independent frontier component separately and combining them via the mine count
+        total, mine_weights = count_configurations(self.bitboard, remaining_mines)
 
+        # Deduce mines and safe cells based on consistent configurations
+        step = reasoning_steps_matrix.max() + 1
+        for x, y in self.make_deductions(total, mine_weights):
+            reasoning_steps_matrix[x, y] = step
 
-        # Deduce mines and safe cells based on consistent combinations
-        self.make_deductions(consistent_combinations)
+        return reasoning_steps_matrix
 
     def get_candidate_cells(self):
-        candidate_cells = []
-        for x in range(self.game.length):
-            for y in range(self.game.width):
-                if ((not self.game.is_cell_revealed(x, y))
-                     and (not self.game.is_cell_flagged(x, y)) 
-                     and not self.game.is_cell_safe(x, y)):
-                    candidate_cells.append((x, y))
-        return candidate_cells
+        # cells that are neither revealed, flagged nor marked as safe
+        bitboard = self.bitboard
+        return bitboard.cells(bitboard.unknown | bitboard.mines | bitboard.probes)
 
     def get_flagged_mines_count(self):
-        flagged_count = 0
-        for x in range(self.game.length):
-            for y in range(self.game.width):
-                if self.game.is_cell_flagged(x, y):
-                    flagged_count += 1
-        return flagged_count
-
-
-    def filter_consistent_combinations(self, combinations):
+        return popcount(self.bitboard.flagged)
+
+    def filter_consistent_combinations(self, combinations, candidate_cells=None):
+        """
+        Keep the combinations of mines that are consistent with the current game state.
+
+        combinations is either a boolean (K, n_candidates) matrix over candidate_cells
+        (default: get_candidate_cells()), in which case the consistent rows are returned, or an
+        iterable of tuples of cells, in which case the consistent tuples are returned. Either
+        way, the check is a product with the numbered-cell x candidate adjacency matrix,
+        compared to the residual counts, for a chunk of combinations at a time.
+        """
+        if candidate_cells is None:
+            candidate_cells = self.get_candidate_cells()
+        adjacency, residuals = self.get_constraint_matrix(candidate_cells)
+
+        if isinstance(combinations, np.ndarray):
+            return combinations[consistent_rows(combinations, adjacency, residuals)]
+
+        combinations = iter(combinations)
+        index = {cell: i for i, cell in enumerate(candidate_cells)}
         consistent_combinations = []
-        for combination in combinations:
-            if self.is_combination_consistent(combination):
-                consistent_combinations.append(combination)
+        for chunk in iter(lambda: list(itertools.islice(combinations, CHUNK_SIZE)), []):
+            matrix = np.zeros((len(chunk), len(candidate_cells)), dtype=bool)
+            for row, combination in enumerate(chunk):
+                matrix[row, [index[cell] for cell in combination]] = True
+            consistent = consistent_rows(matrix, adjacency, residuals)
+            consistent_combinations += [combination for combination, ok in zip(chunk, consistent) if ok]
         return consistent_combinations
 
+    def get_constraint_matrix(self, candidate_cells):
+        """
+        Build the (revealed cells x candidate cells) adjacency matrix and the residual count of
+        every revealed cell, i.e. its number minus the adjacent flags.
+        """
+        bitboard = self.bitboard
+        revealed = list(iterate_bits(bitboard.revealed))
+        candidate_mask = self.combination_to_mask(candidate_cells, bitboard)
+        index = {x * self.game.width + y: i for i, (x, y) in enumerate(candidate_cells)}
+
+        adjacency = np.zeros((len(revealed), len(candidate_cells)), dtype=np.int8)
+        residuals = np.zeros(len(revealed), dtype=np.int64)
+        for row, i in enumerate(revealed):
+            adjacency[row, [index[j] for j in iterate_bits(bitboard.neighbour_masks[i] & candidate_mask)]] = 1
+            residuals[row] = int(bitboard.numbers[i]) - popcount(bitboard.neighbour_masks[i] & bitboard.flagged)
+        return adjacency, residuals
+
+    def combination_to_mask(self, combination, bitboard=None):
+        bitboard = self.bitboard if bitboard is None else bitboard
+        mask = 0
+        for x, y in combination:
+            mask |= bitboard.bit(x, y)
+        return mask
+
     def is_combination_consistent(self, combination):
-        for x in range(self.game.length):
-            for y in range(self.game.width):
-                if self.game.is_cell_revealed(x, y):
-                    num = self.game.current_game_state[x, y]
-                    if num != self.count_adjacent_mines(x, y, combination):
-                        return False
-        return True
+        # every revealed number must equal its adjacent flags plus adjacent mines in the combination
+        bitboard = self.bitboard
+        return bitboard.is_consistent(self.combination_to_mask(combination, bitboard))
 
     def count_adjacent_mines(self, x, y, combination):
-        count = 0
-        for dx in [-1, 0, 1]:
-            for dy in [-1, 0, 1]:
-                if (dx, dy) != (0, 0) and (x + dx, y + dy) in combination:
-                    count += 1
-        return count
-
-    def make_deductions(self, consistent_combinations):
-        if not consistent_combinations:
-            return  
-
-        candidate_cells = self.get_candidate_cells()
-        for cell in candidate_cells:
-
-            if all(cell in combination for combination in consistent_combinations):
-                # If the cell is a mine in all combinations, flag it as a mine
+        bitboard = self.bitboard
+        return bitboard.count_adjacent(self.combination_to_mask(combination, bitboard), x, y)
+
+    def make_deductions(self, total, mine_weights):
+        # returns the cells that were flagged or marked safe
+        deduced_cells = []
+        if total == 0:
+            return deduced_cells
+
+        for cell in self.get_candidate_cells():
+            weight = mine_weights[cell[0] * self.game.width + cell[1]]
+            if weight == total:
+                # If the cell is a mine in all configurations, flag it as a mine
                 self.game.toggle_flag(cell[0], cell[1])
-            elif all(cell not in combination for combination in consistent_combinations):
-                # If the cell is safe in all combinations, mark safe
-                self.game.mark_safe(cell[0], cell[1])
+            elif weight == 0:
+                # If the cell is safe in all configurations, mark safe
+                self.game.toggle_mark_safe(cell[0], cell[1])
+            else:
+                continue
+            deduced_cells.append(cell)
+        # the flags and safe marks were set without moves, which the bitboard would not notice
+        self.invalidate_bitboard()
+        return deduced_cells
 
 
 
@@ -9,6 +9,7 @@ with open('./config.json') as config_file:
 DATABASE_NAME = config['DATABASE_NAME']
 TRIALS_TABLE_NAME = config['TRIALS_TABLE_NAME']
 SUBJECTS_TABLE_NAME = config['SUBJECTS_TABLE_NAME']
+GAMES_TABLE_NAME = config['GAMES_TABLE_NAME']
 
 def get_db_connection():
     conn = sqlite3.connect(DATABASE_NAME)
@@ -44,6 +45,12 @@ def init_db():
                         experience TEXT,
                         feedback TEXT
                         )''')
+
+    cursor.execute(f'''CREATE TABLE IF NOT EXISTS {GAMES_TABLE_NAME} (
+                        game_id TEXT PRIMARY KEY,
+                        game_data BLOB,
+                        updated_at REAL
+                        )''')
     conn.commit()
     conn.close()
 
@@ -103,4 +110,36 @@ def save_exit_data(prolific_id, score, bonus, survey_data):
         print(f"Database error: {e}")
     except Exception as e:
         # Handle any other error
-        print(f"Error: {e}")
\ No newline at end of file
+        print(f"Error: {e}")
+
+def save_game_data(game_id, game_data, updated_at):
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            f'''INSERT OR REPLACE INTO {GAMES_TABLE_NAME} (game_id, game_data, updated_at)
+               VALUES (?, ?, ?)''',
+            (game_id, game_data, updated_at)
+        )
+        conn.commit()
+
+
+def load_game_data(game_id, min_updated_at):
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            f'''SELECT game_data FROM {GAMES_TABLE_NAME} WHERE game_id = ? AND updated_at >= ?''',
+            (game_id, min_updated_at)
+        )
+        row = cursor.fetchone()
+    return row[0] if row is not None else None
+
+
+def delete_game_data(game_id=None, max_updated_at=None):
+    # delete a single game, or all games last updated before max_updated_at
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        if game_id is not None:
+            cursor.execute(f'''DELETE FROM {GAMES_TABLE_NAME} WHERE game_id = ?''', (game_id,))
+        if max_updated_at is not None:
+            cursor.execute(f'''DELETE FROM {GAMES_TABLE_NAME} WHERE updated_at < ?''', (max_updated_at,))
+        conn.commit()
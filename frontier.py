@@ -0,0 +1,264 @@
+from bitboard import iterate_bits, popcount
+import functools
+import math
+import numpy as np
+
+# components with at most this many squares are enumerated by checking all 2^n placements at once
+MAX_VECTORIZED_CELLS = 16
+
+# number of placements checked per matrix product in consistent_rows
+CHUNK_SIZE = 1 << 16
+
+
+def consistent_rows(placements, adjacency, targets):
+    """
+    Check a batch of mine placements against a set of constraints in one matrix product.
+
+    Parameters:
+    - placements (np.ndarray): (K, n) boolean matrix, one candidate placement per row.
+    - adjacency (np.ndarray): (m, n) 0/1 matrix, constraint x square adjacency.
+    - targets (np.ndarray): (m,) number of mines required per constraint.
+
+    Returns:
+    - np.ndarray: (K,) boolean mask of the placements satisfying all constraints.
+    """
+    adjacency = np.asarray(adjacency, dtype=np.float32).T
+    consistent = np.zeros(len(placements), dtype=bool)
+    for start in range(0, len(placements), CHUNK_SIZE):
+        chunk = np.asarray(placements[start:start + CHUNK_SIZE], dtype=np.float32)
+        consistent[start:start + CHUNK_SIZE] = np.all(chunk @ adjacency == targets, axis=1)
+    return consistent
+
+
+@functools.lru_cache(maxsize=4096)
+def binomial(n, k):
+    """ Number of ways to choose k of n items (0 if k is out of range). """
+    if k < 0 or k > n:
+        return 0
+    return math.factorial(n) // (math.factorial(k) * math.factorial(n - k))
+
+
+def convolve(a, b):
+    """ Product of two polynomials given as coefficient lists (exact integer arithmetic). """
+    result = [0] * (len(a) + len(b) - 1)
+    for i, x in enumerate(a):
+        if x:
+            for j, y in enumerate(b):
+                result[i + j] += x * y
+    return result
+
+
+class FrontierComponent:
+    """
+    A set of unresolved squares linked by shared numbered neighbours, together with the
+    constraints of these numbers. Components are independent: the mines in one component
+    do not affect which configurations are possible in another, except through the total
+    number of mines.
+    """
+
+    def __init__(self, cells, constraints):
+        """
+        Parameters:
+        - cells (list): Flat indices of the squares in the component.
+        - constraints (list): (local indices into cells, number of mines among them) per numbered square.
+        """
+        self.cells = cells
+        self.constraints = constraints
+
+    def enumerate_solutions(self):
+        """
+        Enumerate all mine placements consistent with the constraints. Small components are
+        checked exhaustively in one batch (see consistent_rows), larger ones by backtracking,
+        pruning a branch as soon as a constraint has too many mines or can no longer
+        reach its number.
+
+        Returns:
+        - solution_counts (list): solution_counts[k] is the number of solutions with k mines.
+        - cell_counts (list): cell_counts[i][k] is the number of those solutions in which
+          cells[i] is a mine.
+        """
+        num_cells = len(self.cells)
+        if num_cells <= MAX_VECTORIZED_CELLS:
+            return self.enumerate_solutions_vectorized()
+
+        solution_counts = [0] * (num_cells + 1)
+        cell_counts = [[0] * (num_cells + 1) for _ in range(num_cells)]
+
+        targets = [target for _, target in self.constraints]
+        num_mines = [0] * len(self.constraints)
+        num_unassigned = [len(cells) for cells, _ in self.constraints]
+        cell_constraints = [[] for _ in range(num_cells)]
+        for c, (cells, _) in enumerate(self.constraints):
+            for i in cells:
+                cell_constraints[i].append(c)
+        assignment = [0] * num_cells
+
+        def backtrack(i, k):
+            if i == num_cells:
+                solution_counts[k] += 1
+                for j in range(num_cells):
+                    if assignment[j]:
+                        cell_counts[j][k] += 1
+                return
+
+            for value in (0, 1):
+                feasible = True
+                for c in cell_constraints[i]:
+                    num_unassigned[c] -= 1
+                    num_mines[c] += value
+                    if num_mines[c] > targets[c] or num_mines[c] + num_unassigned[c] < targets[c]:
+                        feasible = False
+                if feasible:
+                    assignment[i] = value
+                    backtrack(i + 1, k + value)
+                for c in cell_constraints[i]:
+                    num_unassigned[c] += 1
+                    num_mines[c] -= value
+            assignment[i] = 0
+
+        backtrack(0, 0)
+        return solution_counts, cell_counts
+
+    def enumerate_solutions_vectorized(self):
+        """ Same as enumerate_solutions, checking all 2^n placements with matrix products. """
+        num_cells = len(self.cells)
+        adjacency = np.zeros((len(self.constraints), num_cells), dtype=np.int8)
+        for c, (cells, _) in enumerate(self.constraints):
+            adjacency[c, cells] = 1
+        targets = np.array([target for _, target in self.constraints])
+
+        placements = (np.arange(1 << num_cells)[:, None] >> np.arange(num_cells)) & 1
+        solutions = placements[consistent_rows(placements, adjacency, targets)]
+
+        # tally solutions and mines per square by number of mines in the solution
+        num_mines = solutions.sum(axis=1)
+        by_num_mines = np.zeros((len(solutions), num_cells + 1), dtype=np.int64)
+        by_num_mines[np.arange(len(solutions)), num_mines] = 1
+        solution_counts = by_num_mines.sum(axis=0)
+        cell_counts = solutions.T @ by_num_mines
+        return [int(count) for count in solution_counts], [[int(count) for count in row] for row in cell_counts]
+
+
+def get_frontier_components(bitboard):
+    """
+    Split the unresolved squares of a game state into independent frontier components.
+
+    Unresolved squares are those that are neither revealed, flagged nor marked as safe.
+    Squares adjacent to a revealed number form the frontier; two frontier squares are in
+    the same component if they are connected through shared numbered neighbours.
+
+    Parameters:
+    - bitboard (BitBoard): The game state.
+
+    Returns:
+    - components (list): FrontierComponent objects, or None if a revealed number can not be satisfied.
+    - interior (list): Flat indices of the unresolved squares not adjacent to any revealed number.
+    """
+    unresolved = bitboard.unknown | bitboard.mines | bitboard.probes
+
+    # one constraint (unresolved neighbours, number minus adjacent flags) per revealed square
+    constraints = []
+    frontier = 0
+    for i in iterate_bits(bitboard.revealed):
+        cells = bitboard.neighbour_masks[i] & unresolved
+        target = int(bitboard.numbers[i]) - popcount(bitboard.neighbour_masks[i] & bitboard.flagged)
+        if target < 0 or target > popcount(cells):
+            return None, []
+        if cells:
+            constraints.append((cells, target))
+            frontier |= cells
+
+    # merge constraints that share squares with a union-find over squares
+    parent = {i: i for i in iterate_bits(frontier)}
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for cells, _ in constraints:
+        first, *rest = iterate_bits(cells)
+        for i in rest:
+            parent[find(i)] = find(first)
+
+    # group squares and constraints by component, squares ordered by discovery for early pruning
+    component_cells = {}
+    component_constraints = {}
+    for cells, target in constraints:
+        root = find(next(iterate_bits(cells)))
+        cell_list = component_cells.setdefault(root, [])
+        for i in iterate_bits(cells):
+            if i not in cell_list:
+                cell_list.append(i)
+        component_constraints.setdefault(root, []).append((cells, target))
+
+    components = []
+    for root, cells in component_cells.items():
+        local_index = {i: local for local, i in enumerate(cells)}
+        local_constraints = [([local_index[i] for i in iterate_bits(mask)], target)
+                             for mask, target in component_constraints[root]]
+        components.append(FrontierComponent(cells, local_constraints))
+
+    interior = list(iterate_bits(unresolved & ~frontier))
+    return components, interior
+
+
+def count_configurations(bitboard, remaining_mines, component_solutions=None):
+    """
+    Count all mine placements consistent with a game state and the total number of mines.
+
+    Each frontier component is enumerated separately. The components are then combined by
+    multiplying their solution-count polynomials (indexed by number of mines), and the
+    remaining mines are distributed over the interior squares, which contributes a binomial
+    factor. All arithmetic is exact.
+
+    Parameters:
+    - bitboard (BitBoard): The game state.
+    - remaining_mines (int): Number of mines not accounted for by flags.
+    - component_solutions (callable): Optional replacement for FrontierComponent.enumerate_solutions,
+      e.g. a cached version, called with the component.
+
+    Returns:
+    - total (int): Number of consistent placements (0 if the game state is inconsistent).
+    - mine_weights (dict): Flat index -> number of consistent placements with a mine on that square,
+      for every unresolved square.
+    """
+    components, interior = get_frontier_components(bitboard)
+    if components is None:
+        return 0, {}
+    enumerate_solutions = component_solutions or FrontierComponent.enumerate_solutions
+    results = [enumerate_solutions(component) for component in components]
+
+    num_interior = len(interior)
+
+    def weigh(polynomial, interior_squares, interior_mines=0):
+        # sum over s mines on the frontier, the rest (minus interior_mines) spread over the interior
+        return sum(count * binomial(interior_squares, remaining_mines - interior_mines - s)
+                   for s, count in enumerate(polynomial) if count)
+
+    # products of all component polynomials before and after each component
+    prefix = [[1]]
+    for solution_counts, _ in results:
+        prefix.append(convolve(prefix[-1], solution_counts))
+    suffix = [[1]]
+    for solution_counts, _ in reversed(results):
+        suffix.append(convolve(suffix[-1], solution_counts))
+    suffix.reverse()
+
+    total = weigh(prefix[-1], num_interior)
+    mine_weights = {}
+    if total == 0:
+        return 0, mine_weights
+
+    for c, (component, (_, cell_counts)) in enumerate(zip(components, results)):
+        others = convolve(prefix[c], suffix[c + 1])
+        for i, counts in zip(component.cells, cell_counts):
+            mine_weights[i] = weigh(convolve(others, counts), num_interior)
+
+    if num_interior:
+        interior_weight = weigh(prefix[-1], num_interior - 1, interior_mines=1)
+        for i in interior:
+            mine_weights[i] = interior_weight
+
+    return total, mine_weights
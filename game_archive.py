@@ -0,0 +1,65 @@
+import struct
+
+import numpy as np
+
+from game_logic import Game
+
+# archive layout: header, (num_games + 1) uint64 offsets into the file, then the encoded games
+ARCHIVE_MAGIC = b'MSWA'
+ARCHIVE_VERSION = 1
+ARCHIVE_HEADER = struct.Struct('<4sBxxxQ')  # magic, version, padding, number of games
+
+
+def save_games(file_path, games, compress=False, include_history=True):
+    """
+    Save many games to a single binary archive, each encoded with Game.to_bytes.
+
+    Parameters:
+    - file_path (str): Path of the archive to write.
+    - games (iterable of Game): The games to save.
+    - compress (bool): zlib-compress each game. Uncompressed archives can be loaded without copying.
+    - include_history (bool): Store the moves and game states of each game.
+    """
+    encoded = [game.to_bytes(compress=compress, include_history=include_history) for game in games]
+    offsets = ARCHIVE_HEADER.size + 8 * (len(encoded) + 1) + np.cumsum([0] + [len(data) for data in encoded])
+
+    with open(file_path, 'wb') as file:
+        file.write(ARCHIVE_HEADER.pack(ARCHIVE_MAGIC, ARCHIVE_VERSION, len(encoded)))
+        file.write(offsets.astype('<u8').tobytes())
+        for data in encoded:
+            file.write(data)
+
+
+class GameArchive:
+    """
+    Read-only access to a game archive written by save_games.
+
+    The file is memory-mapped, so opening an archive is cheap and games are only
+    decoded when they are accessed.
+    """
+
+    def __init__(self, file_path):
+        self.data = np.memmap(file_path, dtype=np.uint8, mode='r')
+        magic, version, num_games = ARCHIVE_HEADER.unpack_from(self.data)
+        if magic != ARCHIVE_MAGIC or version != ARCHIVE_VERSION:
+            raise ValueError(f"Invalid archive: {file_path}")
+        self.offsets = self.data[ARCHIVE_HEADER.size:ARCHIVE_HEADER.size + 8 * (num_games + 1)].view('<u8')
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("archive index out of range")
+        return Game.from_bytes(self.data[self.offsets[index]:self.offsets[index + 1]])
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+
+def load_games(file_path):
+    """ Open a game archive written by save_games. """
+    return GameArchive(file_path)
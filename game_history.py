@@ -0,0 +1,125 @@
+import numpy as np
+
+
+class DeltaHistory:
+    """
+    Compact replacement for the list of {'move', 'game_state'} snapshots in Game.game_states.
+
+    Instead of a full copy of the game state per move, only the cells changed by each move
+    are stored (flat indices and new values). A full keyframe is kept every keyframe_interval
+    moves so that any historical state can be reconstructed by applying at most
+    keyframe_interval - 1 deltas.
+
+    The class behaves like a read-only list of snapshots: indexing (including negative
+    indices), len() and iteration all return {'move', 'game_state'} dictionaries,
+    with the game_state reconstructed on demand.
+    """
+
+    def __init__(self, shape, initial_state=None, keyframe_interval=32):
+        """
+        Parameters:
+        - shape (tuple): Shape of the game states (length, width).
+        - initial_state (np.ndarray): State before the first recorded move, defaults to all unseen (-1).
+        - keyframe_interval (int): Number of moves between stored full snapshots.
+        """
+        self.shape = tuple(shape)
+        self.keyframe_interval = keyframe_interval
+        self.initial_state = (np.full(self.shape, -1) if initial_state is None
+                              else np.array(initial_state).reshape(self.shape))
+        self.moves = []
+        self.deltas = []      # per move: (flat indices, new values)
+        self.keyframes = {}   # move index -> full game state after that move
+        self.last_state = self.initial_state.copy()
+
+    @classmethod
+    def from_states(cls, game_states, shape, keyframe_interval=32):
+        """ Build a delta history from a list of full {'move', 'game_state'} snapshots. """
+        history = cls(shape, keyframe_interval=keyframe_interval)
+        for game_round in game_states:
+            history.append(game_round)
+        return history
+
+    def append(self, game_round):
+        """ Record a move and the game state following it, storing only the changed cells. """
+        game_state = np.asarray(game_round['game_state']).reshape(-1)
+        last_state = self.last_state.reshape(-1)
+        changed = np.flatnonzero(game_state != last_state)
+
+        self.moves.append(game_round['move'])
+        self.deltas.append((changed, game_state[changed].copy()))
+        last_state[changed] = game_state[changed]
+
+        if (len(self.moves) - 1) % self.keyframe_interval == 0:
+            self.keyframes[len(self.moves) - 1] = self.last_state.copy()
+
+    def get_game_state(self, index):
+        """ Reconstruct the game state after move number index from the closest keyframe. """
+        keyframe = index - index % self.keyframe_interval
+        game_state = self.keyframes[keyframe].copy()
+        flat_state = game_state.reshape(-1)
+        for changed, values in self.deltas[keyframe + 1:index + 1]:
+            flat_state[changed] = values
+        return game_state
+
+    def __len__(self):
+        return len(self.moves)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("history index out of range")
+        return {'move': self.moves[index], 'game_state': self.get_game_state(index)}
+
+    def __iter__(self):
+        # replay all deltas once instead of reconstructing every state from a keyframe
+        game_state = self.initial_state.copy()
+        flat_state = game_state.reshape(-1)
+        for move, (changed, values) in zip(self.moves, self.deltas):
+            flat_state[changed] = values
+            yield {'move': move, 'game_state': game_state.copy()}
+
+    def serialize(self):
+        """ Serialize the history to a JSON-compatible format. """
+        return {
+            'shape': list(self.shape),
+            'keyframe_interval': self.keyframe_interval,
+            'initial_state': self.initial_state.tolist(),
+            'moves': [list(move) if isinstance(move, tuple) else move for move in self.moves],
+            'deltas': [[changed.tolist(), values.tolist()] for changed, values in self.deltas]
+        }
+
+    @classmethod
+    def from_deltas(cls, shape, initial_state, moves, deltas, keyframe_interval=32, keyframes=None):
+        """
+        Rebuild a DeltaHistory from its moves and deltas (see serialize and Game.to_bytes).
+
+        Parameters:
+        - keyframes (list): The stored keyframes in order (one per keyframe_interval moves),
+          or None to reconstruct them by replaying the deltas.
+        """
+        history = cls(shape, initial_state=initial_state, keyframe_interval=keyframe_interval)
+        history.moves = list(moves)
+        history.deltas = list(deltas)
+        if keyframes is not None:
+            history.keyframes = {i * keyframe_interval: np.asarray(keyframe).reshape(history.shape)
+                                 for i, keyframe in enumerate(keyframes)}
+            if history.moves:
+                history.last_state = history.get_game_state(len(history.moves) - 1)
+            return history
+
+        last_state = history.last_state.reshape(-1)
+        for index, (changed, values) in enumerate(history.deltas):
+            last_state[changed] = values
+            if index % keyframe_interval == 0:
+                history.keyframes[index] = history.last_state.copy()
+        return history
+
+    @classmethod
+    def deserialize(cls, data):
+        """ Rebuild a DeltaHistory from the output of serialize. """
+        initial_state = np.asarray(data['initial_state'])
+        deltas = [(np.asarray(changed, dtype=np.int64), np.asarray(values, dtype=initial_state.dtype))
+                  for changed, values in data['deltas']]
+        return cls.from_deltas(data['shape'], initial_state, data['moves'], deltas,
+                               keyframe_interval=data['keyframe_interval'])
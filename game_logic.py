@@ -1,12 +1,156 @@
 import numpy as np
 import json
 import random
+import struct
+import zlib
+from game_history import DeltaHistory
+
+# binary format written by Game.to_bytes: little-endian header followed by the payload
+BINARY_MAGIC = b'MSWG'
+BINARY_VERSION = 2  # version 1 stored full game states even for compact histories
+BINARY_HEADER = struct.Struct('<4sBBHHIII')  # magic, version, flags, length, width, num_mines, moves, payload size
+FLAG_COMPRESSED = 1
+FLAG_GAMEPLAY_ENABLED = 2
+FLAG_COMPACT_HISTORY = 4
+FLAG_FIRST_CLICK_SAFE = 8      # mines are placed on the first query, away from it
+FLAG_FIRST_CLICK_NO_GUESS = 16  # as above, and the board is solvable without guessing
+FLAG_REGION_INDEX = 32          # the region index is stored instead of rebuilt when loading
+
+# how new random boards are generated (see Game.__init__)
+GENERATION_MODES = ['uniform', 'safe', 'no_guess']
+# seconds a first move may spend generating a 'no_guess' board before falling back to 'safe'
+NO_GUESS_TIME_LIMIT = 2.0
+
+
+def neighbourhood_sum(array, dtype=np.int32):
+    """
+    Sum every cell's 3x3 neighbourhood (the cell itself included), treating cells
+    outside the board as zero. Works on a single (H, W) array or a stack (..., H, W).
+    """
+    array = np.asarray(array)
+    length, width = array.shape[-2:]
+    padding = [(0, 0)] * (array.ndim - 2) + [(1, 1), (1, 1)]
+    padded = np.pad(array.astype(dtype), padding, mode='constant')
+
+    total = np.zeros(array.shape, dtype=dtype)
+    for dx in range(3):
+        for dy in range(3):
+            total += padded[..., dx:dx + length, dy:dy + width]
+    return total
+
+
+def board_from_mines(mine_matrix):
+    """
+    Compute game boards from mine masks: -1 for mines, otherwise the number of adjacent mines.
+    Works on a single (H, W) mask or a stack (N, H, W) of masks and returns int8 boards.
+    """
+    mine_matrix = np.asarray(mine_matrix, dtype=bool)
+    game_board = neighbourhood_sum(mine_matrix, dtype=np.int8) - mine_matrix
+    game_board[mine_matrix] = -1
+    return game_board
+
+
+def generate_boards(n, length, width, num_mines, seed=None, first_click=None, safe_radius=1):
+    """
+    Generate a batch of random game boards with num_mines mines each.
+
+    Mines are placed by taking the num_mines smallest of a row of random keys per board, and
+    all adjacent-mine counts are computed with a single padded 3x3 sum over the whole batch.
+    Single boards can be wrapped without copying: Game(game_board=boards[i], game_states=[]).
+
+    Parameters:
+    - n (int): Number of boards.
+    - length, width (int): Board dimensions.
+    - num_mines (int): Number of mines per board.
+    - seed (int): Seed for a batch-local random generator. If None, numpy's global random state is used.
+    - first_click (tuple): If given, no mines are placed in the 3x3 area around (x, y),
+      so that the first query opens a safe region.
+    - safe_radius (int): Size of the mine-free area around first_click: 1 for the 3x3 area,
+      0 for only the queried square.
+
+    Returns:
+    - boards (np.ndarray): (n, length, width) int8 array of game boards.
+    - mine_matrices (np.ndarray): (n, length, width) boolean mine masks.
+    """
+    num_cells = length * width
+    safe_cells = np.zeros((length, width), dtype=bool)
+    if first_click is not None:
+        x, y = first_click
+        safe_cells[max(x - safe_radius, 0):x + safe_radius + 1, max(y - safe_radius, 0):y + safe_radius + 1] = True
+    if not 0 <= num_mines <= num_cells - np.sum(safe_cells):
+        raise ValueError("Invalid number of mines for the board size")
+
+    rng = np.random if seed is None else np.random.RandomState(seed)
+    mine_matrices = np.zeros((n, num_cells), dtype=bool)
+    if num_mines > 0:
+        keys = rng.random_sample((n, num_cells))
+        keys[:, safe_cells.reshape(-1)] = 2  # larger than any key, never selected
+        mine_cells = np.argpartition(keys, num_mines - 1, axis=1)[:, :num_mines]
+        mine_matrices[np.arange(n)[:, None], mine_cells] = True
+
+    mine_matrices = mine_matrices.reshape((n, length, width))
+    return board_from_mines(mine_matrices), mine_matrices
+
+
+def label_zero_regions(game_board):
+    """
+    Label the 8-connected regions of empty (0) cells on a game board.
+
+    Works on horizontal runs of empty cells rather than single cells: runs in
+    consecutive rows are merged with a union-find if their columns touch, so the
+    Python-level work is proportional to the number of runs, not cells.
+
+    Returns:
+    - labels (np.ndarray): H x W int32 array, 0 for non-empty cells and 1..n for regions.
+    - num_regions (int): number of regions found.
+    """
+    zero = np.asarray(game_board) == 0
+    length, width = zero.shape
+
+    # find the [start, end) columns of all runs of empty cells, in row-major order
+    padded = np.zeros((length, width + 2), dtype=np.int8)
+    padded[:, 1:-1] = zero
+    edges = np.diff(padded, axis=1)
+    run_rows, run_starts = np.nonzero(edges == 1)
+    _, run_ends = np.nonzero(edges == -1)
+    row_first = np.searchsorted(run_rows, np.arange(length + 1))
+
+    parent = list(range(len(run_rows)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    # merge runs in consecutive rows whose column spans touch (diagonals included)
+    for row in range(1, length):
+        i, i_end = row_first[row - 1], row_first[row]
+        j, j_end = row_first[row], row_first[row + 1]
+        while i < i_end and j < j_end:
+            if run_starts[i] <= run_ends[j] and run_starts[j] <= run_ends[i]:
+                parent[find(i)] = find(j)
+            if run_ends[i] < run_ends[j]:
+                i += 1
+            else:
+                j += 1
+
+    # compact the union-find roots into consecutive region ids
+    roots = np.array([find(i) for i in range(len(parent))], dtype=np.int64)
+    _, run_labels = np.unique(roots, return_inverse=True)
+
+    # empty cells appear in the same row-major order as the runs they belong to
+    labels = np.zeros((length, width), dtype=np.int32)
+    labels[zero] = np.repeat(run_labels.reshape(-1) + 1, run_ends - run_starts)
+    return labels, len(np.unique(roots))
+
 
 class Game:
     logging = True
     
     def __init__(self, length=None, width=None, num_mines=None, 
-                 game_board=None, game_states=None, file_path=None):  
+                 game_board=None, game_states=None, file_path=None, region_index=None,
+                 compact_history=False, generation_mode='uniform', first_click=None):  
         """
         Initialize a new instance of the Game class.
 
@@ -36,7 +180,25 @@ class Game:
         1. From a JSON file, rebuilding the game state from saved data.
         2. Using provided game board and states, useful for testing specific scenarios.
         3. Creating a new game with specified length, width, and number of mines.
+
+        A previously built region index (see build_region_index) can be passed as
+        region_index to avoid rebuilding it, e.g. when deserializing.
+
+        With compact_history=True, game_states is kept as a DeltaHistory that stores only
+        the cells changed by each move (plus periodic keyframes) instead of full snapshots.
+
+        New random games support three generation modes:
+        - 'uniform': mines are placed uniformly at random.
+        - 'safe': the 3x3 area around the first query never contains a mine.
+        - 'no_guess': as 'safe', and the board can be solved from the first query without guessing.
+        In the last two modes, the mines are placed around first_click if it is given,
+        otherwise they are (re)placed when the first query is made.
         """
+        if generation_mode not in GENERATION_MODES:
+            raise ValueError(f"Invalid generation mode '{generation_mode}'")
+        self.generation_mode = generation_mode
+        self.first_click_pending = False
+
         if file_path is not None:
             # Initialize from a JSON file
             with open(file_path, 'r') as file:
@@ -45,27 +207,37 @@ class Game:
             self.game_states = [{'move' : game_round['move'], 'game_state' : np.asarray(game_round['game_state'])} for game_round in data['game_states']] # parse into numpy array data structure
             self.length, self.width = self.game_board.shape
             self.num_mines = np.sum(self.game_board == -1)
+            self.build_region_index()
             #self.log("game initialized from file")
         elif game_board is not None and game_states is not None:
-            # Initialize with provided game board and states
-            self.game_board = np.array(game_board)
+            # Initialize with provided game board and states (arrays are used without copying)
+            self.game_board = np.asarray(game_board)
             self.game_states = game_states
             self.length, self.width = self.game_board.shape
             self.num_mines = np.sum(self.game_board == -1)
+            if region_index is not None:
+                self.set_region_index(region_index)
+            else:
+                self.build_region_index()
             #self.log("game initialized from user input")
         elif length is not None and width is not None and num_mines is not None:
             # Initialize a new game
             self.length = length
             self.width = width
             self.num_mines = num_mines
-            self.game_board = self.initialize_game_board()
+            self.game_board = self.initialize_game_board(first_click)
             self.game_states = []
+            self.first_click_pending = generation_mode != 'uniform' and first_click is None
             #self.log("game randomly initialized from user input")
         else:
             raise ValueError("Invalid arguments for game initialization")
         
-        # retrieve last game state if available, or initialize
-        self.current_game_state = np.asarray(self.game_states[-1]["game_state"]) if len(self.game_states) > 0 else np.full((self.length, self.width), -1)
+        if compact_history and not isinstance(self.game_states, DeltaHistory):
+            self.game_states = DeltaHistory.from_states(self.game_states, (self.length, self.width))
+
+        # retrieve last game state if available (as a copy, since moves change it in place and
+        # would otherwise change the last recorded state too), or initialize
+        self.current_game_state = np.array(self.game_states[-1]["game_state"]) if len(self.game_states) > 0 else np.full((self.length, self.width), -1)
         self.gameplay_enabled = True
         
         # show the game board and current game state
@@ -84,8 +256,11 @@ class Game:
         game_board_list = self.game_board.tolist()
         current_game_state_list = self.current_game_state.tolist()
         
-        # Convert each game state's NumPy array to a list
-        game_states_list = [{'move': state['move'], 'game_state': state['game_state'].tolist()} for state in self.game_states]
+        # Convert each game state's NumPy array to a list, or store the deltas of a compact history
+        if isinstance(self.game_states, DeltaHistory):
+            game_states_list = self.game_states.serialize()
+        else:
+            game_states_list = [{'move': state['move'], 'game_state': state['game_state'].tolist()} for state in self.game_states]
 
         # Create a dictionary of all attributes to be serialized
         serialized_data = {
@@ -95,7 +270,14 @@ class Game:
             'game_board': game_board_list,
             'game_states': game_states_list,
             'current_game_state': current_game_state_list,
-            'gameplay_enabled': self.gameplay_enabled
+            'gameplay_enabled': self.gameplay_enabled,
+            'generation_mode': self.generation_mode,
+            'first_click_pending': self.first_click_pending,
+            'region_index': {
+                'labels': self.region_labels.tolist(),
+                'cells': self.region_cells.tolist(),
+                'offsets': self.region_offsets.tolist()
+            }
         }
 
         return serialized_data
@@ -113,16 +295,161 @@ class Game:
         """
         # Convert lists back to NumPy arrays
         game_board = np.array(data['game_board'])
-        game_states = [{'move': state['move'], 'game_state': np.array(state['game_state'])} for state in data['game_states']]
+        if isinstance(data['game_states'], dict):
+            game_states = DeltaHistory.deserialize(data['game_states'])
+        else:
+            game_states = [{'move': state['move'], 'game_state': np.array(state['game_state'])} for state in data['game_states']]
 
         # Create a new Game instance using the deserialized data
         game = cls(
             game_board=game_board,
-            game_states=game_states
+            game_states=game_states,
+            region_index=data.get('region_index')
         )
         game.gameplay_enabled = data['gameplay_enabled']
+        game.generation_mode = data.get('generation_mode', 'uniform')
+        game.first_click_pending = data.get('first_click_pending', False)
         return game
     
+    def to_bytes(self, compress=False, include_history=True, include_region_index=False):
+        """
+        Encode the game in a compact binary format.
+
+        Layout: a little-endian header (magic, version, flags, length, width, num_mines,
+        number of moves, payload size) followed by the payload, optionally zlib-compressed:
+        - the mine mask, bit-packed (numbers on the board are recomputed when loading),
+        - the current game state as int8,
+        - the moves as int16 triples (x, y, action), (-1, -1, -1) for moves that are not triples,
+        - the history: for a full history, the game state after every move as int8. For a
+          compact history (FLAG_COMPACT_HISTORY), the keyframe interval as uint32, the initial
+          state and the keyframes as int8, the number of changed cells per move as uint32, and
+          the flat indices (uint32) and new values (int8) of all changed cells,
+        - with FLAG_REGION_INDEX, the region labels as int32, followed by the region offsets
+          and region cells as uint32 (see build_region_index).
+
+        Args:
+        compress (bool or int): zlib-compress the payload, an int gives the compression level.
+        include_history (bool): store the moves and game states, or only the current state.
+        include_region_index (bool): store the region index, so that loading does not rebuild it.
+        """
+        compact = isinstance(self.game_states, DeltaHistory)
+        if compact:
+            history = self.game_states if include_history else DeltaHistory((self.length, self.width))
+            move_list = history.moves
+        else:
+            game_states = list(self.game_states) if include_history else []
+            move_list = [game_round['move'] for game_round in game_states]
+        moves = np.full((len(move_list), 3), -1, dtype='<i2')
+        for i, move in enumerate(move_list):
+            if isinstance(move, (list, tuple)) and len(move) == 3:
+                moves[i] = move
+
+        sections = [
+            np.packbits(self.game_board == -1).tobytes(),
+            self.current_game_state.astype(np.int8).tobytes(),
+            moves.tobytes()
+        ]
+        if compact:
+            keyframes = [history.keyframes[i] for i in range(0, len(history), history.keyframe_interval)]
+            sections += [np.uint32(history.keyframe_interval).astype('<u4').tobytes(),
+                         history.initial_state.astype(np.int8).tobytes()]
+            sections += [keyframe.astype(np.int8).tobytes() for keyframe in keyframes]
+            sections.append(np.array([len(changed) for changed, _ in history.deltas], dtype='<u4').tobytes())
+            sections += [changed.astype('<u4').tobytes() for changed, _ in history.deltas]
+            sections += [values.astype(np.int8).tobytes() for _, values in history.deltas]
+        else:
+            sections += [np.asarray(game_round['game_state'], dtype=np.int8).tobytes() for game_round in game_states]
+        if include_region_index:
+            sections += [self.region_labels.astype('<i4').tobytes(),
+                         self.region_offsets.astype('<u4').tobytes(),
+                         self.region_cells.astype('<u4').tobytes()]
+
+        payload = b''.join(sections)
+        if compress:
+            payload = zlib.compress(payload, -1 if compress is True else compress)
+
+        flags = ((FLAG_COMPRESSED if compress else 0)
+                 | (FLAG_GAMEPLAY_ENABLED if self.gameplay_enabled else 0)
+                 | (FLAG_COMPACT_HISTORY if compact else 0)
+                 | (FLAG_REGION_INDEX if include_region_index else 0))
+        if self.first_click_pending:
+            flags |= FLAG_FIRST_CLICK_NO_GUESS if self.generation_mode == 'no_guess' else FLAG_FIRST_CLICK_SAFE
+        header = BINARY_HEADER.pack(BINARY_MAGIC, BINARY_VERSION, flags, self.length, self.width,
+                                    int(self.num_mines), len(move_list), len(payload))
+        return header + payload
+
+    @classmethod
+    def from_bytes(cls, data):
+        """
+        Decode a game written by to_bytes (also reads the full-history layout of version 1).
+
+        Args:
+        data (bytes, memoryview or np.ndarray of uint8): The encoded game, e.g. a slice of a memory-mapped file.
+        Uncompressed history states are returned as read-only views into data.
+
+        Returns:
+        Game: A new instance of Game.
+        """
+        data = memoryview(data).cast('B')
+        magic, version, flags, length, width, num_mines, num_moves, payload_size = BINARY_HEADER.unpack_from(data)
+        if magic != BINARY_MAGIC or version not in (1, BINARY_VERSION):
+            raise ValueError("Invalid data: not a binary Minesweeper game")
+
+        payload = data[BINARY_HEADER.size:BINARY_HEADER.size + payload_size]
+        if flags & FLAG_COMPRESSED:
+            payload = zlib.decompress(payload)
+        payload = np.frombuffer(payload, dtype=np.uint8)
+
+        # read the payload section by section
+        position = [0]
+
+        def read(count, dtype=np.uint8):
+            dtype = np.dtype(dtype)
+            start = position[0]
+            position[0] += count * dtype.itemsize
+            return payload[start:position[0]].view(dtype)
+
+        num_cells = length * width
+        mine_bits = read((num_cells + 7) // 8)
+        current_game_state = read(num_cells, np.int8)
+        moves = read(3 * num_moves, '<i2').reshape((num_moves, 3)).tolist()
+        moves = [tuple(move) if move[0] >= 0 else None for move in moves]
+
+        # rebuild the board from the mine mask
+        game_board = board_from_mines(np.unpackbits(mine_bits)[:num_cells].reshape((length, width)))
+
+        compact = bool(flags & FLAG_COMPACT_HISTORY)
+        if compact and version >= 2:
+            keyframe_interval = int(read(1, '<u4')[0])
+            initial_state = read(num_cells, np.int8)
+            num_keyframes = -(-num_moves // keyframe_interval)
+            keyframes = read(num_keyframes * num_cells, np.int8).reshape((num_keyframes, length, width))
+            counts = read(num_moves, '<u4').astype(np.int64)
+            changed = np.split(read(int(counts.sum()), '<u4').astype(np.int64), np.cumsum(counts)[:-1])
+            values = np.split(read(int(counts.sum()), np.int8), np.cumsum(counts)[:-1])
+            game_states = DeltaHistory.from_deltas((length, width), initial_state, moves,
+                                                   list(zip(changed, values)) if num_moves else [],
+                                                   keyframe_interval=keyframe_interval, keyframes=list(keyframes))
+        else:
+            states = read(num_cells * num_moves, np.int8).reshape((num_moves, length, width))
+            game_states = [{'move': move, 'game_state': game_state} for move, game_state in zip(moves, states)]
+
+        region_index = None
+        if flags & FLAG_REGION_INDEX:
+            labels = read(num_cells, '<i4').reshape((length, width))
+            offsets = read(int(labels.max()) + 1 if num_cells else 1, '<u4').astype(np.int64)
+            cells = read(int(offsets[-1]) if len(offsets) else 0, '<u4').astype(np.int64)
+            region_index = {'labels': labels, 'cells': cells, 'offsets': offsets}
+
+        game = cls(game_board=game_board, game_states=game_states, region_index=region_index,
+                   compact_history=compact)
+        game.current_game_state = current_game_state.reshape((length, width)).astype(int)
+        game.gameplay_enabled = bool(flags & FLAG_GAMEPLAY_ENABLED)
+        if flags & (FLAG_FIRST_CLICK_SAFE | FLAG_FIRST_CLICK_NO_GUESS):
+            game.generation_mode = 'no_guess' if flags & FLAG_FIRST_CLICK_NO_GUESS else 'safe'
+            game.first_click_pending = True
+        return game
+
     def has_unique_solution(self):
         """
         Placeholder for a function to check if the current game configuration has a unique solution.
@@ -198,57 +525,124 @@ class Game:
         board_str += border
         return board_str
 
-    def initialize_game_board(self):
+    def initialize_game_board(self, first_click=None):
         """
         Initialize a new game board with mines placed randomly.
         Also calculates and populates the board with numbers indicating adjacent mines.
+        In the 'safe' and 'no_guess' generation modes, first_click is kept free of mines.
         """
-        # Create the mine vector [1 if mine and 0 otherwise] and shuffle it
-        mine_vector = np.array([1] * self.num_mines + [0] * (self.length * self.width - self.num_mines))
-        np.random.shuffle(mine_vector)
+        if self.generation_mode == 'uniform':
+            first_click = None
 
-        # Reshape the vector into a matrix
-        mine_matrix = mine_vector.reshape((self.length, self.width))
-        
-        self.game_board = np.zeros(mine_matrix.shape, dtype=int)
-
-        # Directions to shift: (dx, dy)
-        shifts = [(-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1)]
-        for dx, dy in shifts:
-            # Shift the matrix
-            shifted_matrix = np.roll(mine_matrix, shift=(dx, dy), axis=(0, 1))
-
-            # Set wrapped rows and/or columns to zero
-            if dx == -1: shifted_matrix[-1, :] = 0
-            elif dx == 1: shifted_matrix[0, :] = 0
-            if dy == -1: shifted_matrix[:, -1] = 0
-            elif dy == 1: shifted_matrix[:, 0] = 0
+        if self.generation_mode == 'no_guess' and first_click is not None:
+            # imported here since the board generator relies on the solver, which imports this module
+            from board_generator import generate_no_guess_board
+            try:
+                game_board = generate_no_guess_board(self.length, self.width, self.num_mines, first_click,
+                                                     time_limit=NO_GUESS_TIME_LIMIT)
+            except ValueError:
+                # don't keep the first move waiting: settle for a board with a safe first click
+                self.log("no board without guessing found in time, falling back to a safe board")
+                self.generation_mode = 'safe'
+                game_board = None
+        else:
+            game_board = None
+        if game_board is None:
+            # with too many mines to keep the 3x3 area around the first query free, keep only the
+            # queried square free, or place the mines uniformly if not even that square can be spared
+            x, y = first_click if first_click is not None else (0, 0)
+            safe_area = (min(x + 2, self.length) - max(x - 1, 0)) * (min(y + 2, self.width) - max(y - 1, 0))
+            safe_radius = 1
+            if first_click is not None and self.num_mines > self.length * self.width - safe_area:
+                self.log("too many mines for a safe area around the first query, keeping only the square itself free")
+                safe_radius = 0
+                if self.num_mines >= self.length * self.width:
+                    first_click = None
+            boards, _ = generate_boards(1, self.length, self.width, self.num_mines, first_click=first_click,
+                                        safe_radius=safe_radius)
+            game_board = boards[0]
+        self.game_board = game_board
+        self.build_region_index()
+        return self.game_board
 
-            # Add to the adjacent mines matrix
-            self.game_board += shifted_matrix
+    def build_region_index(self):
+        """
+        Precompute the connected regions of empty cells on the game board.
 
-        # Set cells with mines to -1
-        self.game_board[mine_matrix == 1] = -1
-        return self.game_board
+        Stores:
+        - region_labels: H x W array with the region id of every empty cell (0 otherwise).
+        - region_cells: flat indices of the cells revealed by clicking into each region
+          (the region and its numbered border), grouped by region id.
+        - region_offsets: region k reveals region_cells[region_offsets[k-1]:region_offsets[k]].
+        """
+        labels, _ = label_zero_regions(self.game_board)
+        rows, cols = np.nonzero(labels)
+        region_ids = labels[rows, cols]
+
+        # pair every empty cell's region with each cell of its 3x3 neighbourhood
+        region_cells = []
+        for dx in [-1, 0, 1]:
+            for dy in [-1, 0, 1]:
+                nx, ny = rows + dx, cols + dy
+                inside = (0 <= nx) & (nx < self.length) & (0 <= ny) & (ny < self.width)
+                region_cells.append(region_ids[inside].astype(np.int64) * self.length * self.width
+                                    + nx[inside] * self.width + ny[inside])
+        region_cells = np.unique(np.concatenate(region_cells))
+
+        self.region_labels = labels
+        self.region_cells = region_cells % (self.length * self.width)
+        self.region_offsets = np.searchsorted(region_cells // (self.length * self.width),
+                                              np.arange(1, labels.max() + 2))
+
+    def set_region_index(self, region_index):
+        """ Restore a region index from its serialized form (see serialize). """
+        self.region_labels = np.asarray(region_index['labels'], dtype=np.int32)
+        self.region_cells = np.asarray(region_index['cells'], dtype=np.int64)
+        self.region_offsets = np.asarray(region_index['offsets'], dtype=np.int64)
 
     def reveal(self, x, y):
         """
-        Recursively reveal cells starting from the specified location (x, y).
-        Reveals adjacent cells if the revealed cell is empty (has no adjacent mines).
+        Reveal the cell at (x, y). If the cell is empty (has no adjacent mines), its whole
+        connected region of empty cells and their numbered border are looked up in the
+        region index and revealed in one masked assignment.
+        If an empty cell of the region is not unseen (a marker, or revealed while a marker
+        blocked an earlier cascade), it stops the cascade, so the region is flood filled over
+        unseen cells instead. Revealed or marked cells on the numbered border do not matter.
         """
+        if self.current_game_state[x, y] != -1 or self.game_board[x, y] == -1:
+            return
 
+        region = self.region_labels[x, y]
+        if region == 0:
+            self.current_game_state[x, y] = self.game_board[x, y]
+            return
 
-        if self.current_game_state[x, y] != -1 or self.game_board[x, y] == -1:
+        cells = self.region_cells[self.region_offsets[region - 1]:self.region_offsets[region]]
+        rows, cols = np.divmod(cells, self.width)
+        states = self.current_game_state[rows, cols]
+        board = self.game_board[rows, cols]
+        if ((board == 0) & (states != -1)).any():
+            self.flood_reveal(x, y)
             return
+        hidden = states == -1
+        self.current_game_state[rows[hidden], cols[hidden]] = board[hidden]
 
-        self.current_game_state[x, y] = self.game_board[x, y]
-        # check all adjacent cells if cell is empty
-        if self.game_board[x, y] == 0:
-            for dx in [-1, 0, 1]:
-                for dy in [-1, 0, 1]:
-                    nx, ny = x + dx, y + dy
-                    if 0 <= nx < self.length and 0 <= ny < self.width:
-                        self.reveal(nx, ny)
+    def flood_reveal(self, x, y):
+        """
+        Reveal the unseen cell at (x, y) and, if it is empty, cascade through its unseen
+        neighbours, without recursion.
+        """
+        stack = [(x, y)]
+        while stack:
+            x, y = stack.pop()
+            if self.current_game_state[x, y] != -1:
+                continue
+            self.current_game_state[x, y] = self.game_board[x, y]
+            if self.game_board[x, y] == 0:
+                for nx in range(max(x - 1, 0), min(x + 2, self.length)):
+                    for ny in range(max(y - 1, 0), min(y + 2, self.width)):
+                        if self.current_game_state[nx, ny] == -1:
+                            stack.append((nx, ny))
     
     def move(self, x, y, action):
         """ 
@@ -306,6 +700,11 @@ class Game:
         if self.current_game_state[x, y] == -4: 
             self.log("Error: Cannot reveal square marked as safe.")
             return False
+
+        if self.first_click_pending:
+            # place the mines now that the first query is known
+            self.first_click_pending = False
+            self.initialize_game_board(first_click=(x, y))
     
         if self.game_board[x, y] == -1:
             # end game and reveal location of all mines
@@ -363,7 +762,7 @@ class Game:
         """
         data = {
             "game_board": self.convert_to_serializable(self.game_board),
-            "game_states": self.convert_to_serializable(self.game_states)
+            "game_states": self.convert_to_serializable(list(self.game_states))
         }
         with open(file_name, 'w') as file:
             file.write(json.dumps(data)) # TODO: deal with JSON formatting
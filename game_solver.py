@@ -1,17 +1,45 @@
 import numpy as np
-from game_logic import Game
+from game_logic import Game, neighbourhood_sum
+from bitboard import BitBoard
+from sat_solver import find_forced_cells
+from solver_cache import resolve_cache
+import functools
 import itertools
 import random
 
+# relative coordinates of the 8 neighbours of a square
+NEIGHBOUR_OFFSETS = np.array([(dx, dy) for dx, dy in itertools.product([-1, 0, 1], repeat=2) if (dx, dy) != (0, 0)])
+
+
+@functools.lru_cache(maxsize=64)
+def neighbour_table(length, width):
+    """
+    Flat indices (length * width, 8) of the 8 neighbours of every square of a board, and a
+    mask of those that lie on the board. Neighbours off the board point at the square itself.
+    """
+    squares = np.arange(length * width)
+    rows, cols = np.divmod(squares, width)
+    nx = rows[:, None] + NEIGHBOUR_OFFSETS[:, 0]
+    ny = cols[:, None] + NEIGHBOUR_OFFSETS[:, 1]
+    on_board = (nx >= 0) & (nx < length) & (ny >= 0) & (ny < width)
+    neighbours = np.where(on_board, nx * width + ny, squares[:, None])
+    neighbours.flags.writeable = False
+    on_board.flags.writeable = False
+    return neighbours, on_board
+
 class Solver:
-    def __init__(self, solver_type='naive'):
+    def __init__(self, solver_type='naive', cache=None):
         """
         Initialize the Solver with a specific solving strategy.
 
         Parameters:
-        - solver_type (str): Type of solver to use. Currently, only 'naive' is implemented.
+        - solver_type (str): Type of solver to use: 'naive', or 'sat' for naive deductions
+          completed by a cardinality-constraint solver (see sat_solver).
+        - cache (SolverCache): Cache of solver results by game state (see solver_cache),
+          True for the shared cache, or None to always solve.
         """
         self.solver_type = solver_type
+        self.cache = resolve_cache(cache)
     
     def sample_probe(self, game_state):
         candidate_squares = self.get_unexplored_adjacent_to_number(game_state)
@@ -30,9 +58,39 @@ class Solver:
         - max_steps (int): Maximum number of steps to attempt in solving the game.
         """
         if (self.solver_type == 'naive') or (self.solver_type == "brute_force"):
-            return self.naive_solver(game, max_steps, use_contradiction, **kwargs)
+            solver = self.naive_solver
+        elif self.solver_type == 'sat':
+            solver = self.sat_solver
         else:
             raise NotImplementedError(f"Solver type '{self.solver_type}' is not implemented.")
+
+        params = (max_steps, use_contradiction, tuple(sorted(kwargs.items())))
+        return self.cached_solve(game, params, lambda: solver(game, max_steps, use_contradiction, **kwargs))
+
+    def cached_solve(self, game, params, solve):
+        """
+        Run solve() (which solves game in place and returns the reasoning steps matrix) unless
+        the cache holds the result for the current game state, solver type and params.
+        On a cache hit, the cached game state is written into the game directly and recorded
+        as a single history entry without a move. (Replaying the deductions as moves would
+        reject those on probes, or in games that are over, which the solver may have made.)
+        """
+        if self.cache is None:
+            return solve()
+
+        game_state = game.current_game_state.copy()
+        params = (self.solver_type, int(game.num_mines)) + params
+        cached = self.cache.get(game_state, params)
+        if cached is not None:
+            reasoning_steps_matrix, solved_state = cached
+            if not np.array_equal(solved_state, game_state):
+                game.current_game_state[...] = solved_state
+                game.game_states.append({'move': None, 'game_state': np.copy(game.current_game_state)})
+            return reasoning_steps_matrix
+
+        reasoning_steps_matrix = solve()
+        self.cache.put(game_state, np.stack([reasoning_steps_matrix, game.current_game_state]), params)
+        return reasoning_steps_matrix
         
     def naive_solver(self, game, max_steps, use_contradiction, **kwargs):
         """
@@ -42,28 +100,38 @@ class Solver:
         
         Parameters:
         - max_steps (int): Maximum number of steps for the naive solver.
-        - **kwargs: Additional keyword arguments for customizing the solver's behavior.
+        - **kwargs: Additional keyword arguments for customizing the solver's behavior:
+            - contradiction_depth (int): Maximum number of nested assumptions in contradiction testing (default 1).
         """        
+        contradiction_depth = kwargs.get('contradiction_depth', 1)
+
         # keeps track of how many steps required for each undecided square
         reasoning_steps_matrix = np.zeros(shape=game.current_game_state.shape).astype(int) - 1
         reasoning_steps_matrix[game.current_game_state == -1] = 0
-        
-        for step in range(max_steps):
-            moves = []
-            for (x, y) in self.get_numbered_squares(game.current_game_state):
-                # find simple direct deductions
-                moves += self.deduce_moves_from_cell(game.current_game_state, x, y)
-
 
+        # numbered squares to (re-)evaluate: all of them at first, afterwards only those
+        # next to a square that changed in the previous step
+        dirty_squares = None
 
+        # the frontier (in row-major order) and the neighbour counts only change around the
+        # squares decided by a step, so they are updated there rather than recomputed each step
+        frontier = dict.fromkeys(self.get_unexplored_adjacent_to_number(game.current_game_state))
+        counts = self.count_neighbours(game.current_game_state)
 
+        for step in range(max_steps):
+            # find simple direct deductions for all dirty numbered squares at once
+            moves = self.deduce_moves(game.current_game_state, dirty_squares, counts)
+            changed_squares = [(x, y) for (x, y, _) in moves]
+            previous_values = {square: game.current_game_state[square] for square in changed_squares}
 
             contradiction_found = False
             if use_contradiction and (not moves):  # If no moves found by naive approach, try contradiction
-                for (x, y) in self.get_unexplored_adjacent_to_number(game.current_game_state):
-                    if self.test_contradiction(game.current_game_state, game, x, y):
+                for (x, y) in frontier:
+                    if self.test_contradiction(game.current_game_state, game, x, y, depth=contradiction_depth):
                         contradiction_found = True
                         reasoning_steps_matrix[x, y] = step + 1
+                        changed_squares.append((x, y))
+                        previous_values[(x, y)] = -1
                         break  # Break if a contradiction is found and resolved
             
             # mark flag and clear positions
@@ -71,16 +139,47 @@ class Solver:
                 game.move(x, y, action)
                 reasoning_steps_matrix[x, y] = step + 1
 
+            for (x, y), value in previous_values.items():
+                self.update_neighbour_counts(counts, game.current_game_state, x, y, value)
+                if game.current_game_state[x, y] != -1:
+                    frontier.pop((x, y), None)
 
             # Termination condition
             if not moves and not contradiction_found:
                 #print(f'No further deductions possible. Terminating after {step+1} steps.\nDeduction steps:')
                 #print(game.board_to_string(reasoning_steps_matrix, replace={'-1' : ' '}))
                 break
+
+            dirty_squares = self.get_adjacent_numbered(game.current_game_state, changed_squares)
         
             
         return reasoning_steps_matrix
 
+    def sat_solver(self, game, max_steps, use_contradiction, **kwargs):
+        """
+        Run the naive solver, then complete its deductions with a cardinality-constraint
+        solver that uses all revealed numbers and the total number of mines together.
+        Squares only deduced by the latter get the step after the last naive step.
+
+        !Note that the solver will make changes to the game state representation!
+
+        Parameters:
+        - max_steps (int): Maximum number of steps for the naive solver.
+        - **kwargs: As for naive_solver, and:
+            - max_decisions (int): Decision limit per constraint solver call (default 100000).
+        """
+        reasoning_steps_matrix = self.naive_solver(game, max_steps, use_contradiction, **kwargs)
+
+        mines, safe = find_forced_cells(game.current_game_state, game.num_mines,
+                                        max_decisions=kwargs.get('max_decisions', 100000))
+        step = reasoning_steps_matrix.max() + 1
+        for (x, y), action in [(cell, 1) for cell in mines] + [(cell, 2) for cell in safe]:
+            if game.current_game_state[x, y] == -1:
+                game.move(x, y, action)
+                reasoning_steps_matrix[x, y] = step
+
+        return reasoning_steps_matrix
+
     def get_numbered_squares(self, game_state, x=None, y=None, max_distance=1):
         """
         Retrieve coordinates of squares with numbers, optionally limited to those within a certain distance from a given point if (x, y) is provided.
@@ -111,17 +210,8 @@ class Solver:
         Retrieve coordinates of unexplored squares that are adjacent to a numbered square.
         Useful for decision-making in game strategies.
         """
-        rows, cols = game_state.shape
-        locations = []
-
-        for i in range(rows):
-            for j in range(cols):
-                if game_state[i, j] == -1:  # Check only unexplored squares
-                    adjacent_squares = self.get_adjacent_squares(game_state, i, j)
-                    if any(game_state[nx, ny] in range(1, 9) for nx, ny in adjacent_squares):
-                        locations.append((i, j))
-
-        return locations
+        bitboard = BitBoard.from_game_state(game_state)
+        return bitboard.cells(bitboard.frontier())
     
     def count_unaccounted_mines(self, game_state, x, y):
         """
@@ -153,49 +243,182 @@ class Solver:
 
         return proposed_moves
 
-    def test_contradiction(self, game_state, game, x, y, max_distance=None):
+    def get_neighbourhoods(self, game_state, squares):
         """
-        Test if placing a flag at (x, y) leads to a contradiction with adjacent numbers.
-        To do this, check which new implications follow from the flag for all squares around (x, y)
-        that are at most max_distance squares away, and see if this leads to a contradiction.
-        
-        !Currently only search depth of 1!
+        Gather the 8 neighbours of each of the given squares at once. The neighbours are looked
+        up in the board's neighbour table, so the cost does not depend on the size of the board.
+
+        Returns:
+        - neighbours (np.ndarray): (k, 8) flat indices of the neighbours of the k squares.
+        - values (np.ndarray): (k, 8) values of these neighbours, 0 for squares outside the board.
         """
-        game_state_copy = game_state.copy()
-        game_state_copy[x, y] = -3  # Temporarily place a flag
-        contradiction_found = False
-        
-        # Iterate over all numbered squares within max_distance (if specified) or all numbered squares
-        for (nx, ny) in self.get_numbered_squares(game_state_copy, x=x, y=y, max_distance=max_distance or 1):
-            # Deduce legal moves based on the current state
-            moves = self.deduce_moves_from_cell(game_state_copy, nx, ny)
+        width = game_state.shape[1]
+        table, on_board = neighbour_table(*game_state.shape)
+        squares = np.asarray(squares, dtype=int).reshape(-1, 2)
+        flat = squares[:, 0] * width + squares[:, 1]
+        neighbours = table[flat]
+        return neighbours, np.where(on_board[flat], game_state.take(neighbours), 0)
 
-            # Perform proposed moves and check for contradictions
-            for (mx, my, action) in moves:
-                if action == 1:
-                    game_state_copy[mx, my] = -3
-                elif action == 2:
-                    game_state_copy[mx, my] = -4
-                
-                # check if the current move leads to a contradiction in adjacent squares
-                for (px, py) in self.get_numbered_squares(game_state_copy, x=mx, y=my):
-                    num_unaccounted_mines = self.count_unaccounted_mines(game_state_copy, px, py) 
-                    num_adjacent_unexplored = len(self.get_adjacent_unexplored(game_state_copy, px, py))
-                    # Check if the move leads to a contradiction
-                    if num_unaccounted_mines > num_adjacent_unexplored:
-                        contradiction_found = True
-                        break
+    def deduce_moves(self, game_state, squares=None, counts=None):
+        """
+        Vectorized version of deduce_moves_from_cell for many numbered squares at once.
+        Counts the unexplored and flagged neighbours of all given squares (all numbered squares
+        by default) at once, or reads them from counts (see count_neighbours) if given, and
+        returns every forced move (flag or clear) as a sorted list of (x, y, action) tuples.
+        """
+        width = game_state.shape[1]
+        if squares is None:
+            squares = np.argwhere(game_state > 0)
+        squares = np.asarray(squares, dtype=int).reshape(-1, 2)
+        squares = squares[game_state[squares[:, 0], squares[:, 1]] > 0]
 
-                if contradiction_found:
-                    break
-            
-            if contradiction_found:
-                break
-        
-        if contradiction_found:
+        if counts is None:
+            neighbours, values = self.get_neighbourhoods(game_state, squares)
+            num_unexplored = np.sum(values == -1, axis=1)
+            num_flagged = np.sum(values == -3, axis=1)
+        else:
+            num_unexplored, num_flagged = counts[:, squares[:, 0] * width + squares[:, 1]]
+        num_unaccounted_mines = game_state[squares[:, 0], squares[:, 1]] - num_flagged
+
+        # numbered squares whose unexplored neighbours are all safe / all mines
+        clear_squares = num_unaccounted_mines == 0
+        flag_squares = (num_unaccounted_mines > 0) & (num_unaccounted_mines == num_unexplored)
+
+        # only the squares with a forced move need their neighbours
+        forced = (clear_squares | flag_squares) & (num_unexplored > 0)
+        if counts is None:
+            neighbours, values = neighbours[forced], values[forced]
+        else:
+            neighbours, values = self.get_neighbourhoods(game_state, squares[forced])
+        unexplored = values == -1
+
+        moves = []
+        for selected, action in [(flag_squares[forced], 1), (clear_squares[forced], 2)]:
+            targets = np.unique(neighbours[selected][unexplored[selected]])
+            moves += [(int(x), int(y), action) for x, y in zip(*np.divmod(targets, width))]
+        return moves
+
+    def count_neighbours(self, game_state):
+        """ Numbers of unexplored and of flagged neighbours of every square, as a (2, H * W) array. """
+        unexplored = game_state == -1
+        flagged = game_state == -3
+        return np.stack([neighbourhood_sum(unexplored) - unexplored,
+                         neighbourhood_sum(flagged) - flagged]).reshape(2, -1)
+
+    def update_neighbour_counts(self, counts, game_state, x, y, previous_value):
+        """ Update counts (see count_neighbours) after square (x, y) changed from previous_value. """
+        table, on_board = neighbour_table(*game_state.shape)
+        square = x * game_state.shape[1] + y
+        neighbours = table[square][on_board[square]]
+        value = game_state[x, y]
+        counts[0, neighbours] += int(value == -1) - int(previous_value == -1)
+        counts[1, neighbours] += int(value == -3) - int(previous_value == -3)
+
+    def get_adjacent_numbered(self, game_state, squares):
+        """ Coordinates (k, 2) of the distinct numbered squares adjacent to any of the given squares. """
+        neighbours, values = self.get_neighbourhoods(game_state, squares)
+        numbered = np.unique(neighbours[values > 0])
+        return np.stack(np.divmod(numbered, game_state.shape[1]), axis=1)
+
+    def get_nearby_frontier(self, game_state, x, y, max_distance=2):
+        """
+        Unexplored squares adjacent to a numbered square and at most max_distance squares away
+        from (x, y), in row-major order. Only looks at the squares around (x, y).
+        """
+        length, width = game_state.shape
+        nearby = [(cx, cy) for cx in range(max(x - max_distance, 0), min(x + max_distance + 1, length))
+                  for cy in range(max(y - max_distance, 0), min(y + max_distance + 1, width))
+                  if game_state[cx, cy] == -1]
+        if not nearby:
+            return []
+        _, values = self.get_neighbourhoods(game_state, nearby)
+        return [square for square, numbered in zip(nearby, np.any(values > 0, axis=1)) if numbered]
+
+    def test_contradiction(self, game_state, game, x, y, max_distance=None, depth=1):
+        """
+        Test if placing a flag at (x, y), or marking it as safe, leads to a contradiction with
+        the numbers on the board. If assuming a mine leads to a contradiction, (x, y) is marked
+        as safe; if assuming it is safe does, (x, y) is flagged.
+
+        Each assumption is followed by unit propagation to a fixed point (see propagate). With
+        depth > 1, an assumption that does not lead to a contradiction directly is refined by a
+        case split on a nearby unexplored square, searching up to depth nested assumptions.
+        Changes are made on game_state in place and undone through a trail, without copying it.
+
+        Parameters:
+        - max_distance (int): Only propagate through numbered squares at most max_distance
+          squares away from (x, y). None for no limit.
+        - depth (int): Maximum number of nested assumptions.
+        """
+        trail = []
+        if self.leads_to_contradiction(game_state, x, y, -3, depth, trail, max_distance):
             game.move(x, y, 2)  # Mark original square as clear if contradiction is found
-        
+            return True
+        if self.leads_to_contradiction(game_state, x, y, -4, depth, trail, max_distance):
+            game.move(x, y, 1)  # Flag original square if assuming it is clear leads to a contradiction
+            return True
+        return False
+
+    def leads_to_contradiction(self, game_state, x, y, value, depth, trail, max_distance=None):
+        """
+        Assume value (-3 for a mine, -4 for safe) at (x, y), propagate, and report whether this
+        leads to a contradiction. game_state is restored before returning.
+        """
+        mark = len(trail)
+        self.assign(game_state, x, y, value, trail)
+        contradiction_found = not self.propagate(game_state, [(x, y)], trail, (x, y), max_distance)
+
+        if not contradiction_found and depth > 1:
+            # case split: if both cases for a nearby square fail, so does the assumption
+            for (cx, cy) in self.get_nearby_frontier(game_state, x, y):
+                if (self.leads_to_contradiction(game_state, cx, cy, -3, depth - 1, trail, max_distance) and
+                        self.leads_to_contradiction(game_state, cx, cy, -4, depth - 1, trail, max_distance)):
+                    contradiction_found = True
+                    break
+
+        self.undo(game_state, trail, mark)
         return contradiction_found
+
+    def propagate(self, game_state, squares, trail, origin=None, max_distance=None):
+        """
+        Unit propagation: starting from the numbered squares adjacent to the given squares,
+        repeatedly apply all direct deductions (recording them on the trail) until no further
+        deductions follow.
+
+        Returns:
+        - bool: False if a numbered square is contradicted, i.e. it has more flags than its
+          number, or fewer unexplored neighbours than unaccounted mines.
+        """
+        while len(squares) > 0:
+            numbered = self.get_adjacent_numbered(game_state, squares)
+            if origin is not None and max_distance is not None:
+                numbered = numbered[np.max(np.abs(numbered - origin), axis=1) <= max_distance]
+            if len(numbered) == 0:
+                return True
+
+            _, values = self.get_neighbourhoods(game_state, numbered)
+            num_unaccounted_mines = game_state[numbered[:, 0], numbered[:, 1]] - np.sum(values == -3, axis=1)
+            if np.any((num_unaccounted_mines < 0) | (num_unaccounted_mines > np.sum(values == -1, axis=1))):
+                return False
+
+            moves = self.deduce_moves(game_state, numbered)
+            for (mx, my, action) in moves:
+                if game_state[mx, my] != -1:
+                    return False  # the same square was deduced to be both a mine and safe
+                self.assign(game_state, mx, my, -3 if action == 1 else -4, trail)
+            squares = [(mx, my) for (mx, my, _) in moves]
+        return True
+
+    def assign(self, game_state, x, y, value, trail):
+        """ Set a square of game_state, remembering its previous value on the trail. """
+        trail.append((x, y, game_state[x, y]))
+        game_state[x, y] = value
+
+    def undo(self, game_state, trail, mark):
+        """ Revert all assignments on the trail made after it had length mark. """
+        while len(trail) > mark:
+            x, y, value = trail.pop()
+            game_state[x, y] = value
     
     
 
@@ -0,0 +1,113 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from database import save_game_data, load_game_data, delete_game_data
+from game_logic import Game
+
+
+class InMemoryGameStore:
+    """
+    Keeps live Game objects in process memory, keyed by a game id stored in the session.
+    Least recently used games are evicted beyond max_games, and games that have not been
+    touched for ttl seconds expire.
+
+    Note that each server process has its own store, so this only works when all requests
+    of a session are served by the same process (e.g. the Flask dev server or a single worker).
+    """
+
+    def __init__(self, max_games=1000, ttl=7200):
+        self.max_games = max_games
+        self.ttl = ttl
+        self.games = OrderedDict()  # game_id -> (game, last access time)
+        self.lock = threading.Lock()
+
+    def add(self, game):
+        """ Store a new game and return its id. """
+        game_id = uuid.uuid4().hex
+        self.save(game_id, game)
+        return game_id
+
+    def save(self, game_id, game):
+        with self.lock:
+            self.games[game_id] = (game, time.time())
+            self.games.move_to_end(game_id)
+            self.evict()
+
+    def get(self, game_id):
+        """ Return the game with the given id, or None if it is unknown or has expired. """
+        with self.lock:
+            entry = self.games.get(game_id)
+            if entry is None:
+                return None
+            game, last_access = entry
+            if time.time() - last_access > self.ttl:
+                del self.games[game_id]
+                return None
+            self.games[game_id] = (game, time.time())
+            self.games.move_to_end(game_id)
+            return game
+
+    def delete(self, game_id):
+        with self.lock:
+            self.games.pop(game_id, None)
+
+    def evict(self):
+        # drop expired games (oldest first) and then the least recently used beyond max_games
+        expiry = time.time() - self.ttl
+        while self.games and next(iter(self.games.values()))[1] < expiry:
+            self.games.popitem(last=False)
+        while len(self.games) > self.max_games:
+            self.games.popitem(last=False)
+
+
+class SQLiteGameStore:
+    """
+    Stores games in the compact binary format (see Game.to_bytes), including their delta
+    history and region index, in the games table of the experiment database, so that games
+    survive restarts and are shared between server processes.
+    """
+
+    def __init__(self, ttl=7200):
+        self.ttl = ttl
+
+    def add(self, game):
+        """ Store a new game and return its id. """
+        game_id = uuid.uuid4().hex
+        self.save(game_id, game)
+        delete_game_data(max_updated_at=time.time() - self.ttl)
+        return game_id
+
+    def save(self, game_id, game):
+        # fastest compression level, since games are saved after every move
+        save_game_data(game_id, game.to_bytes(compress=1, include_region_index=True), time.time())
+
+    def get(self, game_id):
+        """ Return the game with the given id, or None if it is unknown or has expired. """
+        if game_id is None:
+            return None
+        game_data = load_game_data(game_id, time.time() - self.ttl)
+        if game_data is None:
+            return None
+        return Game.from_bytes(game_data)
+
+    def delete(self, game_id):
+        delete_game_data(game_id=game_id)
+
+
+def create_game_store(store_type='memory', max_games=1000, ttl=7200):
+    """
+    Create a game store of the given type.
+
+    Parameters:
+    - store_type (str): 'memory' for an in-process LRU store, 'sqlite' for the database-backed store.
+    - max_games (int): Maximum number of games kept by the in-memory store.
+    - ttl (float): Seconds after which an untouched game expires.
+    """
+    if store_type == 'memory':
+        return InMemoryGameStore(max_games=max_games, ttl=ttl)
+    elif store_type == 'sqlite':
+        return SQLiteGameStore(ttl=ttl)
+    else:
+        raise NotImplementedError(f"Game store type '{store_type}' is not implemented.")
@@ -1,9 +1,14 @@
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from enum import IntEnum
+import functools
+import heapq
 import itertools as it
-import random
 
 import numpy as np
-from scipy.linalg import lu
+
+from probability import mine_probabilities
+from solver_cache import resolve_cache, transform, NUM_SYMMETRIES
 
 debug = False
 
@@ -18,6 +23,13 @@ def P(*a):
         print(*a)
 
 
+# weights to pack 4 squares of 2 bits into one byte, see MineSweeper.pack
+PACK_WEIGHTS = np.array([1, 4, 16, 64], dtype=np.uint8)
+
+# relative positions of the cells within Manhattan distance 3 of a cell, in row-major order
+PAIR_OFFSETS = [(di, dj) for di in range(-3, 4) for dj in range(-3, 4) if 0 < abs(di) + abs(dj) <= 3]
+
+
 class BoardState(IntEnum):
     unknown = -1
     given = 0
@@ -25,8 +37,74 @@ class BoardState(IntEnum):
     proved_clear = 2
 
 
+@functools.lru_cache(maxsize=100000)
+def eliminate(n_unknowns, rows):
+    """
+    Deduce 0/1 unknowns from equations "the unknowns of a row sum to its count".
+
+    The rows are reduced to echelon form by fraction-free integer elimination (taking the first
+    row with a non-zero entry as pivot, as LU with partial pivoting does on 0/1 systems), then
+    back-substituted from the last row: a row whose remaining target equals the largest (or
+    smallest) value its undecided unknowns can sum to fixes all of them. Results are cached by
+    the equations, which only depend on the pattern of unknowns around the cells.
+
+    Parameters:
+    - n_unknowns (int): Number of unknowns.
+    - rows (tuple): (tuple of unknown indices, count) per equation.
+
+    Returns:
+    - tuple: 1 (mine), 0 (clear) or -1 (undecided) per unknown.
+    """
+    U = []
+    for columns, count in rows:
+        row = [0] * (n_unknowns + 1)
+        for c in columns:
+            row[c] = 1
+        row[-1] = count
+        U.append(row)
+
+    r = 0
+    for c in range(n_unknowns):
+        pivot = next((i for i in range(r, len(U)) if U[i][c]), None)
+        if pivot is None:
+            continue
+        U[r], U[pivot] = U[pivot], U[r]
+        p = U[r][c]
+        for i in range(r + 1, len(U)):
+            a = U[i][c]
+            if a:
+                U[i] = [p * x - a * y for x, y in zip(U[i], U[r])]
+        r += 1
+        if r == len(U):
+            break
+
+    proved = [-1] * n_unknowns
+    for row in reversed(U):
+        target = row[-1]
+        free = []
+        for k, a in enumerate(row[:-1]):
+            if not a:
+                continue
+            if proved[k] == -1:
+                free.append(k)
+            else:
+                target -= a * proved[k]
+        ub = sum(row[k] for k in free if row[k] > 0)
+        lb = sum(row[k] for k in free if row[k] < 0)
+
+        if free and target == ub:
+            for k in free:
+                proved[k] = 1 if row[k] > 0 else 0
+        elif free and target == lb:
+            for k in free:
+                proved[k] = 1 if row[k] < 0 else 0
+
+    return tuple(proved)
+
+
 class MineSweeper:
-    def __init__(self, board, x, y, n_mines, discount=0.99):
+    def __init__(self, board, x, y, n_mines, discount=0.99, exact_p_mine=False, cache=None,
+                 symmetric=False, prune_actions=False, tr_cache_size=200000):
         self.board = board.copy()
         H = board.shape[0]
         W = board.shape[1]
@@ -36,6 +114,9 @@ class MineSweeper:
         self.x = x
         self.y = y
         self.n_mines = n_mines
+        self.exact_p_mine = exact_p_mine
+        # deductions by (board, state, action cells), see solver_cache
+        self.cache = resolve_cache(cache)
 
         self.unknown = BoardState.unknown
         self.given = BoardState.given
@@ -43,28 +124,52 @@ class MineSweeper:
         self.proved_clear = BoardState.proved_clear
 
         action = ["flag", "clear"]
-        for i in range(H):
-            for j in range(W):
-                if board[i, j] > 0:
-                    # action.append(f"1_{i}-{j}")
-                    action.append([(i, j)])
-
-        for (i, j), (k, l) in it.product(
-            it.product(range(H), range(W)), it.product(range(H), range(W))
-        ):
-            if (i, j) == (k, l):
-                continue
-            if board[i, j] <= 0 or board[k, l] <= 0:
-                continue
-            if abs(i - k) + abs(j - l) > 3:
+        numbered = [(i, j) for i in range(H) for j in range(W) if board[i, j] > 0]
+        for i, j in numbered:
+            # with prune_actions=True, actions that can not deduce anything or whose cells can
+            # not interact (no common unknown neighbour) are left out
+            if prune_actions and not self.share_unknown(board, (i, j), (i, j)):
                 continue
+            # action.append(f"1_{i}-{j}")
+            action.append([(i, j)])
+
+        # pairs of numbered cells within Manhattan distance 3, looked up around each numbered
+        # cell (offsets in row-major order, so pairs keep the order of a scan over all cells)
+        for i, j in numbered:
+            for di, dj in PAIR_OFFSETS:
+                k, l = i + di, j + dj
+                if k < 0 or k >= H or l < 0 or l >= W or board[k, l] <= 0:
+                    continue
+                if prune_actions and not self.share_unknown(board, (i, j), (k, l)):
+                    continue
 
-            # action.append(f"2_{i}-{j}_{k}-{l}")
-            action.append([(i, j), (k, l)])
+                # action.append(f"2_{i}-{j}_{k}-{l}")
+                action.append([(i, j), (k, l)])
 
         self.actions = action
         self.discount = discount
 
+        self.packed_length = -(-H * W // 4) * 4
+        # with symmetric=True, states are merged with their images under the rotations and
+        # reflections that map the board and the probe onto themselves. Note that this is an
+        # approximation if solve_multiple_rref deduces more in one orientation than another.
+        self.symmetries = self.find_symmetries() if symmetric else {0: None}
+
+        # results of tr by (packed state, action index), least recently used dropped first
+        self.action_index = {id(a): i for i, a in enumerate(self.actions)}
+        self.tr_cache = OrderedDict()
+        self.tr_cache_size = tr_cache_size
+        self.tr_hits = 0
+        self.tr_misses = 0
+
+    def share_unknown(self, board, cell, other):
+        # whether two cells have a common unknown neighbour, i.e. their constraints can interact
+        (i, j), (k, l) = cell, other
+        for a, b in it.product(range(max(i, k) - 1, min(i, k) + 2), range(max(j, l) - 1, min(j, l) + 2)):
+            if 0 <= a < self.H and 0 <= b < self.W and board[a, b] == self.unknown:
+                return True
+        return False
+
     def solve_one(self, state, cell):
         x, y = cell[0]
         mini_board = state[
@@ -90,33 +195,6 @@ class MineSweeper:
             if state[i, j] == self.unknown:
                 yield i, j, new_val
 
-    def linear_equations(self, state, cells):
-        unknowns = {}  # cell -> column index
-        A = np.zeros((len(cells), len(cells) * 8))
-        b = np.zeros(len(cells))
-
-        n_unknowns = 0
-        for idx, (x, y) in enumerate(cells):
-            count = self.board[x, y]
-            for i, j in it.product((x - 1, x, x + 1), (y - 1, y, y + 1)):
-                if (i, j) == (x, y):
-                    continue
-                if i < 0 or i >= self.H or j < 0 or j >= self.W:
-                    continue
-
-                if state[i, j] == self.unknown:
-                    unknown_idx = unknowns.setdefault((i, j), n_unknowns)
-                    A[idx, unknown_idx] = 1
-                    n_unknowns += 1 if unknown_idx == n_unknowns else 0
-
-                if state[i, j] == self.proved_mine:
-                    count -= 1
-
-            b[idx] = count
-
-        A = A[:, :n_unknowns]
-        return A, b, unknowns
-
     # def solve_multiple(self, state, cells):
     #     unknowns = {}
     #     A = np.zeros((len(cells), len(cells) * 8))
@@ -150,64 +228,46 @@ class MineSweeper:
     #         if np.isclose(x[unknown_idx], 1):
     #             yield i, j, self.proved_mine.value
 
-    # def solve_multiple_bp(self, state, cells):
-    #     import cvxopt
+    def sparse_equations(self, state, cells):
+        # the equations of the numbered cells over their unknown neighbours,
+        # each row as (column indices of its unknowns, count)
+        x0 = max(min(x for x, _ in cells) - 1, 0)
+        y0 = max(min(y for _, y in cells) - 1, 0)
+        x1 = min(max(x for x, _ in cells) + 2, self.H)
+        y1 = min(max(y for _, y in cells) + 2, self.W)
+        window = state[x0:x1, y0:y1].tolist()  # python lists are much faster to index
 
-    #     A, b, unknowns = self.linear_equations(state, cells)
+        unknowns = {}  # cell -> column index
+        rows = []
+        for x, y in cells:
+            count = int(self.board[x, y])
+            columns = []
+            for i, j in it.product((x - 1, x, x + 1), (y - 1, y, y + 1)):
+                if (i, j) == (x, y):
+                    continue
+                if i < 0 or i >= self.H or j < 0 or j >= self.W:
+                    continue
 
-    #     n = A.shape[1]
+                value = window[i - x0][j - y0]
+                if value == self.unknown:
+                    columns.append(unknowns.setdefault((i, j), len(unknowns)))
 
-    #     c = cvxopt.matrix(np.ones(n))
-    #     G = cvxopt.matrix(np.concatenate([np.eye(n), -np.eye(n)]))
-    #     h = cvxopt.matrix(np.concatenate([np.ones(n), np.zeros(n)]))
-    #     sol = cvxopt.solvers.lp(c, G, h, cvxopt.matrix(A), cvxopt.matrix(b))
-    #     x = sol["x"]
+                if value == self.proved_mine:
+                    count -= 1
 
-    #     for (i, j), unknown_idx in unknowns.items():
-    #         if np.isclose(x[unknown_idx], 0):
-    #             yield i, j, self.proved_clear.value
-    #         if np.isclose(x[unknown_idx], 1):
-    #             yield i, j, self.proved_mine.value
+            rows.append((tuple(columns), count))
+        return tuple(rows), unknowns
 
     def solve_multiple_rref(self, state, cells):
-        A, b, unknowns = self.linear_equations(state, cells)
-        P("A, b", A, b)
-
-        *_, U = lu(np.concatenate([A, b[:, None]], axis=1))
-        P("U", U)
-
-        proved = np.ones(A.shape[1]) * self.unknown.value
-        for i, row in reversed(list(enumerate(U[:, :-1]))):
-            orig_row = row.copy()
-            P("original row", row)
-            mask = proved != self.unknown.value
-            target = U[i, -1] - (proved[mask] @ row[mask])
-            row = row[~mask]
-            ub = (row > 0).sum()
-            lb = -(row < 0).sum()
-            P("bounds", ub, lb)
-            P("new row", row)
-            P("target", U[i, -1], "adjusted target", target)
-
-            if ub == target:
-                for k in np.where(orig_row != 0)[0]:
-                    if mask[k]:
-                        continue
-                    proved[k] = 1 if orig_row[k] == 1 else 0
-
-            if lb == target:
-                for k in np.where(orig_row != 0)[0]:
-                    if mask[k]:
-                        continue
-                    proved[k] = 1 if orig_row[k] == -1 else 0
-
-            P("proved", proved)
+        rows, unknowns = self.sparse_equations(state, cells)
+        proved = eliminate(len(unknowns), rows)
+        P("rows", rows, "proved", proved)
 
         for (i, j), unknown_idx in unknowns.items():
             p = proved[unknown_idx]
-            if np.isclose(p, 1):
+            if p == 1:
                 yield i, j, self.proved_mine.value
-            elif np.isclose(p, 0):
+            elif p == 0:
                 yield i, j, self.proved_clear.value
 
     def p_mine(self, s, x, y):
@@ -216,28 +276,74 @@ class MineSweeper:
         elif s[x, y] == self.proved_clear:
             return 0.0
 
+        if self.exact_p_mine:
+            # exact probability given the numbers, instead of uniform over unknown cells
+            return mine_probabilities(self.state_to_game_state(s), self.n_mines)[x, y]
+
         return (self.n_mines - (s == self.proved_mine).sum()) / (
             s == self.unknown
         ).sum()
 
     def tr(self, s, a):
+        # memoized transition: a pure function of the state and the action, cached for the
+        # actions in self.actions. The returned states are shared and must not be modified.
+        i = self.action_index.get(id(a))
+        if i is None or not self.tr_cache_size:
+            return self.transition(s, a)
+
+        key = (self.pack(s), i)
+        result = self.tr_cache.get(key)
+        if result is not None:
+            self.tr_hits += 1
+            self.tr_cache.move_to_end(key)
+            return result
+
+        self.tr_misses += 1
+        result = self.transition(s, a)
+        self.tr_cache[key] = result
+        if len(self.tr_cache) > self.tr_cache_size:
+            self.tr_cache.popitem(last=False)
+        return result
+
+    def tr_cache_stats(self):
+        lookups = self.tr_hits + self.tr_misses
+        return {"hits": self.tr_hits, "misses": self.tr_misses, "size": len(self.tr_cache),
+                "hit_rate": self.tr_hits / lookups if lookups else 0.0}
+
+    def transition(self, s, a):
         if a == "flag":
             return [s], [0], 10 * self.p_mine(s, self.x, self.y), True
         if a == "clear":
             return [s], [0], 10 * (1 - self.p_mine(s, self.x, self.y)), True
 
-        solver = self.solve_one
-        if len(a) > 1:
-            solver = self.solve_multiple_rref
+        snew = None
+        if self.cache is not None:
+            # cells numbered in order, as the deductions of solve_multiple_rref depend on it
+            action_cells = np.zeros_like(s)
+            action_cells[tuple(zip(*a))] = np.arange(1, len(a) + 1)
+            planes = np.stack([self.board, s, action_cells])
+            snew = self.cache.get(planes, ("mdp",))
+
+        if snew is None:
+            solver = self.solve_one
+            if len(a) > 1:
+                solver = self.solve_multiple_rref
 
-        snew = s.copy()
-        for move in solver(s, a):
-            x, y, v = move
-            snew[x, y] = v
+            snew = s.copy()
+            for move in solver(s, a):
+                x, y, v = move
+                snew[x, y] = v
+
+            if self.cache is not None:
+                self.cache.put(planes, snew, ("mdp",))
 
         return [snew], [1], -0.5 * 2 ** len(a), False
 
-    def traverse(self, s):
+    def traverse(self, s, workers=None, chunk_size=64):
+        # states are stored in their canonical orientation (see canonical)
+        s = self.canonical(s)[0]
+        if workers is not None and workers > 1:
+            return self.traverse_parallel(s, workers, chunk_size)
         states = [s]
 
         names = {self.hash(s)}
@@ -249,20 +355,146 @@ class MineSweeper:
             for a in range(2, len(self.actions)):
                 P("trying ", self.actions[a])
                 snew, _, _, done = self.tr(s, self.actions[a])
-                if self.hash(snew[0]) not in names:
-                    names.add(self.hash(snew[0]))
-                    stack.append(snew[0])
-                    states.append(snew[0])
+                name = self.hash(snew[0])
+                if name not in names:
+                    names.add(name)
+                    snew = self.canonical(snew[0])[0]
+                    stack.append(snew)
+                    states.append(snew)
+
+        return states
+
+    def traverse_parallel(self, s, workers, chunk_size=64):
+        # breadth-first: the states of each level are expanded in chunks by a pool of worker
+        # processes, and the new states are collected in the order of the level and the actions,
+        # so the result does not depend on the number of workers
+        states = [s]
+        names = {self.hash(s)}
+        level = [s]
+
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(self,)) as executor:
+            while level:
+                chunks = [level[i : i + chunk_size] for i in range(0, len(level), chunk_size)]
+                level = []
+                for successors in executor.map(expand_states, chunks):
+                    for name, snew in successors:
+                        if name not in names:
+                            names.add(name)
+                            level.append(snew)
+                            states.append(snew)
 
         return states
 
+    def expand(self, states):
+        # the distinct successors of the given states, as (hash, canonical state)
+        names = set()
+        successors = []
+        for s in states:
+            for a in range(2, len(self.actions)):
+                snew, _, _, done = self.tr(s, self.actions[a])
+                name = self.hash(snew[0])
+                if name not in names:
+                    names.add(name)
+                    successors.append((name, self.canonical(snew[0])[0]))
+        return successors
+
+    def __getstate__(self):
+        # for worker processes: without the caches (the solver cache holds a lock)
+        state = self.__dict__.copy()
+        state["cache"] = None
+        state["tr_cache"] = OrderedDict()
+        del state["action_index"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.action_index = {id(a): i for i, a in enumerate(self.actions)}
+
     def board_to_state(self, board):
         s = np.array(board).copy()
         s[s != -1] = self.given.value
         return s
 
+    def state_to_game_state(self, s):
+        # encode a state like Game.current_game_state: numbers, -1 unknown, -3 mine, -4 clear
+        game_state = self.board.copy()
+        game_state[s == self.unknown] = -1
+        game_state[s == self.proved_mine] = -3
+        game_state[s == self.proved_clear] = -4
+        return game_state
+
+    def find_symmetries(self):
+        # symmetry k (see solver_cache.transform) -> permutation mapping each action index to
+        # the index of the action on the transformed squares
+        index = np.arange(self.H * self.W).reshape(self.H, self.W)
+        action_index = {str(a): i for i, a in enumerate(self.actions)}
+        probe = self.x * self.W + self.y
+
+        symmetries = {}
+        gathers = []
+        for k in range(NUM_SYMMETRIES):
+            moved = transform(index, k)
+            if moved.shape != index.shape or not (transform(self.board, k) == self.board).all():
+                continue
+            position = np.empty(self.H * self.W, dtype=int)
+            position[moved.ravel()] = np.arange(self.H * self.W)
+            if position[probe] != probe:
+                continue
+
+            permutation = np.arange(len(self.actions))
+            for i, a in enumerate(self.actions[2:], start=2):
+                moved_action = [divmod(int(position[x * self.W + y]), self.W) for x, y in a]
+                permutation[i] = action_index[str(moved_action)]
+            symmetries[k] = permutation
+            gathers.append(moved.ravel())
+
+        # flat indices to gather the image of a state under each symmetry at once
+        self.gathers = np.array(gathers)
+        return symmetries
+
+    def canonical(self, s):
+        # the image of s with the smallest packed encoding, and the symmetry that produces it
+        if len(self.symmetries) == 1:
+            return s, 0
+        i = int(np.argmin(self.pack_images(s)))
+        return s.ravel()[self.gathers[i]].reshape(s.shape), list(self.symmetries)[i]
+
+    def q_values(self, Q, s):
+        # the Q values of s, with Q computed over canonical states (see traverse)
+        c, k = self.canonical(s)
+        if k == 0:
+            return Q[self.pack(c)]
+        return Q[self.pack(c)][self.symmetries[k]]
+
+    def pack(self, s):
+        # 2 bits per square (state + 1), 4 squares per byte, as a hex string (usable as JSON key)
+        codes = np.zeros(self.packed_length, dtype=np.uint8)
+        codes[: s.size] = s.ravel() + 1
+        return (codes.reshape(-1, 4) @ PACK_WEIGHTS).tobytes().hex()
+
+    def pack_images(self, s):
+        # packed encodings of the images of s under all symmetries
+        codes = np.zeros((len(self.gathers), self.packed_length), dtype=np.uint8)
+        codes[:, : s.size] = s.ravel()[self.gathers] + 1
+        return [row.tobytes().hex() for row in codes.reshape(len(codes), -1, 4) @ PACK_WEIGHTS]
+
     def hash(self, s):
-        return str(s)
+        if len(self.symmetries) == 1:
+            return self.pack(s)
+        return min(self.pack_images(s))
+
+
+# MineSweeper of the worker processes of traverse_parallel
+worker_mdp = None
+
+
+def init_worker(mdp):
+    global worker_mdp
+    worker_mdp = mdp
+
+
+def expand_states(states):
+    return worker_mdp.expand(states)
 
 
 class Grid:
@@ -289,107 +521,301 @@ class Grid:
         return s
 
 
-def mcts(mdp, root, max_iter=10, max_depth=10):
-    Q = {}
-    N = {}
-
-    def uct(mdp, s, Q, N):
-        s = mdp.hash(s)
-        return np.argmax(Q[s] + np.sqrt(2 * np.log(N[s].sum()) / N[s]))
-
-    def softmax(mdp, s, Q):
-        s = mdp.hash(s)
-        return random.choices(
-            range(len(mdp.actions)), np.exp(0.1 * Q[s]) / np.exp(0.1 * Q[s]).sum()
-        )[0]
-        # return random.choices(range(len(mdp.actions) - 2), np.exp(0.1 * Q[s][2:]) / np.exp(0.1 * Q[s][2:]).sum())[0]
-
-    def backup(history, Q, N, G):
-        for s, a, reward in reversed(history):
-            s = mdp.hash(s)
-            N[s][a] += 1
-            Q[s][a] += (reward + mdp.discount * G - Q[s][a]) / N[s][a]
-            G = reward + mdp.discount * G
-
-    for _ in range(max_iter):
-        s = root
-        done = False
-        history = []
-
-        while N.get(mdp.hash(s), None) is not None:
-            # a = uct(mdp, s, Q, N)
-            a = softmax(mdp, s, Q)
-            # a = random.choice(range(len(mdp.actions)))
-            ns, ps, reward, done = mdp.tr(s, mdp.actions[a])
-            history.append((s, a, reward))
+class MCTS:
+    """
+    Monte Carlo tree search with softmax action selection and random rollouts.
+
+    Node statistics live in two growing arrays, Q and N (one row per node, one column per
+    action), with rows found by state hash. They are kept between calls of search, so a
+    search from a state reached in an earlier search (e.g. the next state of the same game)
+    reuses the statistics of its subtree.
+
+    Each new leaf is evaluated with rollouts random rollouts, run one after the other; each
+    one updates the statistics of its first action, and their mean return is backed up.
+    """
+
+    def __init__(self, mdp, max_depth=10, rollouts=1, temperature=0.1, seed=None):
+        self.mdp = mdp
+        self.max_depth = max_depth
+        self.rollouts = rollouts
+        self.temperature = temperature
+        self.rng = np.random.RandomState(seed)
+        self.reset()
+
+    def reset(self):
+        self.index = {}  # state hash -> row
+        self.Q = np.zeros((64, len(self.mdp.actions)))
+        self.N = np.zeros((64, len(self.mdp.actions)))
+
+    def add_node(self, s):
+        i = len(self.index)
+        if i == len(self.Q):
+            self.Q = np.concatenate([self.Q, np.zeros_like(self.Q)])
+            self.N = np.concatenate([self.N, np.zeros_like(self.N)])
+        self.index[self.mdp.hash(s)] = i
+        return i
+
+    def sample(self, weights):
+        # index drawn with probability proportional to weights
+        cumulative = np.cumsum(weights)
+        return min(int(np.searchsorted(cumulative, self.rng.random_sample() * cumulative[-1], side="right")),
+                   len(weights) - 1)
+
+    def select(self, i):
+        # softmax over the Q values of node i
+        q = self.temperature * self.Q[i]
+        return self.sample(np.exp(q - q.max()))
+
+    def step(self, s, a):
+        ns, ps, reward, done = self.mdp.tr(s, self.mdp.actions[a])
+        snew = ns[0] if len(ns) == 1 else ns[self.sample(ps)]
+        return snew, reward, done
+
+    def rollout(self, s):
+        # self.rollouts random rollouts from s, one at a time: first actions and discounted returns
+        n_actions = len(self.mdp.actions)
+        first = self.rng.randint(n_actions, size=self.rollouts)
+        returns = np.zeros(self.rollouts)
+        for k in range(self.rollouts):
+            state, a = s, first[k]
+            for depth in range(self.max_depth):
+                state, reward, done = self.step(state, a)
+                returns[k] += (self.mdp.discount**depth) * reward
+                if done:
+                    break
+                a = self.rng.randint(n_actions)
+        return first, returns
+
+    def backup(self, history, G):
+        for i, a, reward in reversed(history):
+            G = reward + self.mdp.discount * G
+            self.N[i, a] += 1
+            self.Q[i, a] += (G - self.Q[i, a]) / self.N[i, a]
+
+    def search(self, root, max_iter=10):
+        """ Run max_iter iterations from root; returns the Q and N values of root. """
+        for _ in range(max_iter):
+            s = root
+            done = False
+            history = []
+
+            i = self.index.get(self.mdp.hash(s))
+            while i is not None:
+                a = self.select(i)
+                snew, reward, done = self.step(s, a)
+                history.append((i, a, reward))
+                if done:
+                    break
+                s = snew
+                i = self.index.get(self.mdp.hash(s))
 
             if done:
-                break
-
-            s = random.choices(ns, ps)[0]
-
-        if done:
-            backup(history, Q, N, 0)
-            continue
-
-        Q[mdp.hash(s)] = np.zeros(len(mdp.actions))
-
-        N[mdp.hash(s)] = np.zeros(len(mdp.actions))
-
-        G = 0
-        i = 0
-
-        while not done and i < max_depth:
-            a = random.choice(range(len(mdp.actions)))
-            ns, ps, reward, done = mdp.tr(s, mdp.actions[a])
-            G += (mdp.discount**i) * reward
-
-            if i == 0:
-                history.append((s, a, reward))
+                self.backup(history, 0)
+                continue
 
-            s = random.choice(ns)
-            i += 1
+            # new leaf: evaluate its actions by rollouts
+            i = self.add_node(s)
+            first, returns = self.rollout(s)
+            for a, G in zip(first, returns):
+                self.N[i, a] += 1
+                self.Q[i, a] += (G - self.Q[i, a]) / self.N[i, a]
+            self.backup(history, returns.mean())
+
+        return self.root_values(root)
+
+    def root_values(self, s):
+        i = self.index.get(self.mdp.hash(s))
+        if i is None:
+            return np.zeros(len(self.mdp.actions)), np.zeros(len(self.mdp.actions))
+        return self.Q[i].copy(), self.N[i].copy()
+
+    def q_dict(self):
+        return {name: self.Q[i] for name, i in self.index.items()}
+
+    def n_dict(self):
+        return {name: self.N[i] for name, i in self.index.items()}
+
+
+def search_root(args):
+    # worker of mcts with workers > 1: an independent search, returning the root statistics
+    mdp, root, max_iter, max_depth, rollouts, seed = args
+    return MCTS(mdp, max_depth, rollouts, seed=seed).search(root, max_iter)
+
+
+def mcts(mdp, root, max_iter=10, max_depth=10, rollouts=1, workers=None, seed=None, tree=None):
+    """
+    Monte Carlo tree search from root (see MCTS). Pass an MCTS object as tree to continue
+    from the statistics of earlier searches.
+
+    With workers > 1, independent searches of max_iter iterations each run in separate
+    processes (root parallelization), and only the root statistics are merged and returned.
+    Such searches start from scratch, so tree can not be combined with workers > 1.
+
+    Returns:
+    - Q (dict): State hash -> Q values per action.
+    - N (dict): State hash -> visit counts per action.
+    """
+    if workers is not None and workers > 1:
+        if tree is not None:
+            raise ValueError("An existing tree can not be searched with workers > 1")
+        seeds = np.random.RandomState(seed).randint(2**31, size=workers)
+        jobs = [(mdp, root, max_iter, max_depth, rollouts, int(k)) for k in seeds]
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(search_root, jobs))
+        N = sum(n for _, n in results)
+        Q = sum(q * n for q, n in results) / np.maximum(N, 1)
+        return {mdp.hash(root): Q}, {mdp.hash(root): N}
+
+    if tree is None:
+        tree = MCTS(mdp, max_depth, rollouts, seed=seed)
+    tree.search(root, max_iter)
+    return tree.q_dict(), tree.n_dict()
+
+
+def transition_table(mdp, states):
+    """
+    Evaluate every action in every state once.
+
+    Returns arrays of shape (len(states), len(mdp.actions)): the index in states of the
+    (first) next state, its probability, the reward and whether the episode ends. The next
+    state of a terminal transition is the state itself.
+    """
+    index = {mdp.hash(s): i for i, s in enumerate(states)}
+    shape = (len(states), len(mdp.actions))
+    next_state = np.zeros(shape, dtype=int)
+    prob = np.zeros(shape)
+    reward = np.zeros(shape)
+    done = np.zeros(shape, dtype=bool)
+
+    for i, s in enumerate(states):
+        for j, a in enumerate(mdp.actions):
+            snew, p, r, d = mdp.tr(s, a)
+            next_state[i, j] = i if d else index[mdp.hash(snew[0])]
+            prob[i, j] = p[0]
+            reward[i, j] = r
+            done[i, j] = d
+
+    return next_state, prob, reward, done
+
+
+def vi(mdp, states, rtol=1e-3, method="sweep"):
+    """
+    Value iteration over the given states. The transitions are computed once (see
+    transition_table), after which the values are updated with one of three methods:
+    - "sweep": update all states at once until no value changes by more than rtol.
+    - "prioritized": prioritized sweeping; back up the state with the largest Bellman error
+      first, and re-queue its predecessors, until no Bellman error exceeds rtol.
+    - "topological": back up each state once, after all its successors. This requires that
+      the transitions form no cycles apart from self-loops (as in MineSweeper, where every
+      deduction reduces the number of unknown squares), and gives exact values.
+    """
+    next_state, prob, reward, done = transition_table(mdp, states)
+    table = next_state, prob, reward, done, mdp.discount
+
+    if method == "sweep":
+        v = sweep_values(table, rtol)
+    elif method == "prioritized":
+        v = prioritized_values(table, rtol)
+    elif method == "topological":
+        v = topological_values(table)
+    else:
+        raise ValueError(f"Unknown value iteration method '{method}'")
+
+    q = backup(table, v)
+    names = [mdp.hash(s) for s in states]
+    Q = {name: q[i] for i, name in enumerate(names)}
+    V = {name: v[i] for i, name in enumerate(names)}
+    return Q, V
 
-        s, a, reward = history.pop(-1)
-        Q[mdp.hash(s)][a] = G
-        N[mdp.hash(s)][a] = 1
-        backup(history, Q, N, G)
 
-    return Q, N
+def backup(table, v, i=slice(None)):
+    # Q values of the states i given the values v
+    next_state, prob, reward, done, discount = table
+    return np.where(done[i], reward[i], prob[i] * (reward[i] + discount * v[next_state[i]]))
 
 
-def vi(mdp, states, rtol=1e-3):
-    V = {mdp.hash(s): 0 for s in states}
+def sweep_values(table, rtol):
+    v = np.zeros(len(table[0]))
     delta = 1
     while delta > rtol:
-        delta = 0
-        for s in states:
-            v_old = V[mdp.hash(s)]
-            V[mdp.hash(s)] = max(
-                [
-                    sum(
-                        p[0] * (r + mdp.discount * V[mdp.hash(snew[0])])
-                        if not done
-                        else r
-                        for snew, p, r, done in [mdp.tr(s, a)]
-                    )
-                    for a in mdp.actions
-                ]
-            )
-            delta = max(delta, abs(V[mdp.hash(s)] - v_old))
-
-    Q = {}
-    for s in states:
-        actions = np.zeros(len(mdp.actions))
-        Q[mdp.hash(s)] = actions
-        for i, a in enumerate(mdp.actions):
-            snew, ps, r, done = mdp.tr(s, a)
-            actions[i] = sum(
-                (p * r + mdp.discount * V[mdp.hash(snew)] if not done else r)
-                for snew, p in zip(snew, ps)
-            )
-
-    return Q, V
+        v_new = backup(table, v).max(axis=1)
+        delta = np.abs(v_new - v).max() if len(v) else 0
+        v = v_new
+    return v
+
+
+def predecessors(table):
+    # state -> states with an action leading to it (including itself for self-loops)
+    next_state, _, _, done, _ = table
+    result = [set() for _ in range(len(next_state))]
+    for i, j in zip(*np.nonzero(~done)):
+        result[next_state[i, j]].add(i)
+    return result
+
+
+def prioritized_values(table, rtol):
+    v = np.zeros(len(table[0]))
+    preds = predecessors(table)
+
+    errors = np.abs(backup(table, v).max(axis=1) - v)
+    priority = {i: e for i, e in enumerate(errors) if e > rtol}
+    queue = [(-e, i) for i, e in priority.items()]
+    heapq.heapify(queue)
+
+    while queue:
+        e, i = heapq.heappop(queue)
+        if priority.get(i) != -e:
+            continue  # stale entry, state was re-queued with another priority
+        del priority[i]
+        v[i] = backup(table, v, i).max()
+
+        for p in preds[i]:
+            e = abs(backup(table, v, p).max() - v[p])
+            if e > rtol and e != priority.get(p):
+                priority[p] = e
+                heapq.heappush(queue, (-e, p))
+    return v
+
+
+def topological_values(table):
+    next_state, prob, reward, done, discount = table
+    n = len(next_state)
+
+    # order the states such that every state comes after its successors (depth-first post-order)
+    successors = [sorted(set(next_state[i][~done[i]]) - {i}) for i in range(n)]
+    order = []
+    status = np.zeros(n, dtype=int)  # 0: new, 1: on stack, 2: done
+    for root in range(n):
+        if status[root]:
+            continue
+        stack = [(root, iter(successors[root]))]
+        status[root] = 1
+        while stack:
+            i, children = stack[-1]
+            for j in children:
+                if status[j] == 1:
+                    raise ValueError("Transitions contain a cycle, use another value iteration method")
+                if status[j] == 0:
+                    status[j] = 1
+                    stack.append((j, iter(successors[j])))
+                    break
+            else:
+                stack.pop()
+                status[i] = 2
+                order.append(i)
+
+    v = np.zeros(n)
+    for i in order:
+        # with v[i] = 0, self-loops are valued as their first step only: the value of repeating
+        # the best self-loop forever, p * r / (1 - p * discount), is solved for separately
+        q = backup(table, v, i)
+        loops = ~done[i] & (next_state[i] == i)
+        best = q[~loops].max() if (~loops).any() else -np.inf
+        if loops.any():
+            p, r = prob[i][loops], reward[i][loops]
+            best = max(best, (p * r / (1 - p * discount)).max())
+        v[i] = best
+    return v
 
 
 class Node:
@@ -401,6 +827,7 @@ class Node:
 
 
 def tree(mdp, s, Q, V):
+    s = mdp.canonical(s)[0]
     root = Node(s, V[mdp.hash(s)])
     stack = [root]
     nodes = {mdp.hash(root.state): root}
@@ -412,7 +839,7 @@ def tree(mdp, s, Q, V):
                 continue
 
             snew, _, r, done = mdp.tr(node.state, a)
-            snew = snew[0]
+            snew = mdp.canonical(snew[0])[0]
             if done:
                 continue
 
@@ -0,0 +1,53 @@
+from bitboard import BitBoard, popcount
+from frontier import FrontierComponent, count_configurations
+import functools
+import numpy as np
+
+
+@functools.lru_cache(maxsize=10000)
+def enumerate_component(num_cells, constraints):
+    """
+    Cached enumeration of a frontier component. Components are identified by their structure
+    only (number of squares and constraints over local square indices), so the same pattern
+    of numbers is enumerated once wherever and whenever it occurs.
+    """
+    return FrontierComponent(list(range(num_cells)), constraints).enumerate_solutions()
+
+
+def cached_solutions(component):
+    constraints = tuple((tuple(cells), target) for cells, target in component.constraints)
+    return enumerate_component(len(component.cells), constraints)
+
+
+def mine_probabilities(game_state, num_mines):
+    """
+    Compute the exact probability that each square contains a mine, given the visible game
+    state and the total number of mines, assuming all placements consistent with the
+    revealed numbers are equally likely and flags are correct.
+
+    Frontier components are enumerated separately (with results cached by structure) and
+    weighted by the number of ways to place the remaining mines on the interior squares.
+
+    Parameters:
+    - game_state (np.ndarray): The game state (see Game).
+    - num_mines (int): Total number of mines on the board.
+
+    Returns:
+    - np.ndarray: Array of the shape of game_state with mine probabilities. Revealed and
+      safe squares are 0, flagged squares are 1. Unresolved squares are NaN if the game
+      state is inconsistent.
+    """
+    game_state = np.asarray(game_state)
+    bitboard = BitBoard.from_game_state(game_state)
+    remaining_mines = num_mines - popcount(bitboard.flagged)
+    total, mine_weights = count_configurations(bitboard, remaining_mines, component_solutions=cached_solutions)
+
+    probabilities = np.zeros(game_state.size)
+    probabilities[bitboard.to_array(bitboard.flagged)] = 1.0
+    unresolved = bitboard.to_array(bitboard.unknown | bitboard.mines | bitboard.probes)
+    if total == 0:
+        probabilities[unresolved] = np.nan
+    else:
+        for i, weight in mine_weights.items():
+            probabilities[i] = weight / total
+    return probabilities.reshape(game_state.shape)
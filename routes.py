@@ -1,7 +1,7 @@
 from flask import render_template, jsonify, request, g, session, redirect, url_for
-from app import app, BONUS_AMOUNT, PROLIFIC_COMPLETION_URL
+from app import app, game_store, BONUS_AMOUNT, PROLIFIC_COMPLETION_URL
 from database import save_trial_data, save_exit_data
-from game_logic import Game
+from game_logic import Game, GENERATION_MODES
 from game_solver import Solver
 import os
 import json
@@ -129,8 +129,8 @@ def get_stimulus():
     # mark probe location
     game.current_game_state[probe[0]][probe[1]] = -5  # Use -5 to represent probe location
     
-    # save game in session object (for interactive gameplay)
-    session['game'] = game.serialize()
+    # save game in the game store (for interactive gameplay)
+    session['game_id'] = game_store.add(game)
     
     # pass game varialbes as lists for rendering
     game_state_unsolved = game.current_game_state.tolist()
@@ -151,21 +151,27 @@ def get_stimulus():
 
 @app.route('/game', methods=['GET', 'POST'])
 def game():
-    # Initialize game with settings
+    # Initialize game with settings, using safe first clicks unless a known mode is requested
+    generation_mode = request.form.get('generation_mode', 'safe')
+    if generation_mode not in GENERATION_MODES:
+        generation_mode = 'safe'
     game = Game(length=request.form.get('length', 10, type=int), 
                 width=request.form.get('width', 10, type=int), 
-                num_mines=request.form.get('mines', 12, type=int))
+                num_mines=request.form.get('mines', 12, type=int),
+                compact_history=True,
+                generation_mode=generation_mode)
 
     # re-initialize session variable to store user actions
     session['user_actions'] = []
     
-    # serialize and store in session variable
-    session['game'] = game.serialize()
+    # store the game server-side and keep its id in the session
+    session['game_id'] = game_store.add(game)
     return render_template('game.html', 
                            game_state=game.current_game_state.tolist(), 
                            length=game.length,
                            width=game.width,
                            num_mines=game.num_mines,
+                           generation_mode=game.generation_mode,
                            interaction_mode='standard') # Possible values: 'disabled', 'standard', 'exploratory'
 
 
@@ -173,17 +179,19 @@ def game():
 def move():
     data = request.json
     
-    # reinitialize game
-    serialized_game = session.get('game')
-    game = Game.deserialize(serialized_game)
+    # retrieve game from the game store
+    game_id = session.get('game_id')
+    game = game_store.get(game_id)
+    if game is None:
+        return jsonify({'result': False, 'game_state': None})
     
     # carry out move
     x, y, action, time = data['x'], data['y'], data['action'], data['time']
     result = game.move(x, y, action)
     new_game_state = game.current_game_state.tolist()
     
-    # serialize and store information in session variables
-    session['game'] = game.serialize()
+    # store updated game and user actions
+    game_store.save(game_id, game)
     user_actions = session.get('user_actions')
     user_actions.append((x, y, action, time))
     session['user_actions'] = user_actions
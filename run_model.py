@@ -22,7 +22,7 @@ for i, stim in enumerate(stimuli):
         )
         if goal == "naive_easy_probe":
             states = mdp.traverse(mdp.board_to_state(state))
-        Q, V = m.vi(mdp, states)
+        Q, V = m.vi(mdp, states, method="topological")
 
         results[-1]["Q_" + goal] = {k: v.tolist() for k, v in Q.items()}
     print("-" * 20)
@@ -0,0 +1,195 @@
+from bitboard import BitBoard, popcount
+from frontier import get_frontier_components
+
+
+class DecisionLimitReached(Exception):
+    pass
+
+
+class CardinalitySolver:
+    """
+    A small DPLL solver for boolean variables under cardinality constraints of the form
+    "between lo and hi of these variables are true".
+
+    Constraints are propagated natively instead of being translated to clauses: once a
+    constraint has hi true variables, its other variables are set to false, and once its
+    true and unassigned variables together only just reach lo, they are all set to true.
+    Assignments are recorded on a trail and undone when backtracking.
+    """
+
+    def __init__(self, num_vars, constraints, max_decisions=None):
+        """
+        Parameters:
+        - num_vars (int): Number of variables, branched on in order 0..num_vars-1.
+        - constraints (list): (variables, lo, hi) tuples.
+        - max_decisions (int): Maximum number of branching decisions per call to solve, None for no limit.
+        """
+        self.num_vars = num_vars
+        self.constraints = list(constraints)
+        self.max_decisions = max_decisions
+
+    def solve(self, assumptions=(), extra_constraints=()):
+        """
+        Search for an assignment satisfying all constraints.
+
+        Parameters:
+        - assumptions (iterable): (variable, value) pairs that must hold.
+        - extra_constraints (iterable): Additional (variables, lo, hi) constraints for this call only.
+
+        Returns:
+        - list: A satisfying assignment (list of bool), or None if there is none.
+
+        Raises DecisionLimitReached if max_decisions is exceeded.
+        """
+        constraints = self.constraints + list(extra_constraints)
+        var_constraints = [[] for _ in range(self.num_vars)]
+        for c, (variables, _, _) in enumerate(constraints):
+            for v in variables:
+                var_constraints[v].append(c)
+
+        values = [None] * self.num_vars
+        num_true = [0] * len(constraints)
+        num_unassigned = [len(variables) for variables, _, _ in constraints]
+        trail = []
+        decisions = [0]
+
+        def assign(v, value):
+            values[v] = value
+            trail.append(v)
+            for c in var_constraints[v]:
+                num_unassigned[c] -= 1
+                num_true[c] += value
+
+        def undo(mark):
+            while len(trail) > mark:
+                v = trail.pop()
+                for c in var_constraints[v]:
+                    num_unassigned[c] += 1
+                    num_true[c] -= values[v]
+                values[v] = None
+
+        def propagate(queue):
+            while queue:
+                c = queue.pop()
+                variables, lo, hi = constraints[c]
+                if num_true[c] > hi or num_true[c] + num_unassigned[c] < lo:
+                    return False
+                if num_unassigned[c] == 0:
+                    continue
+                if num_true[c] == hi:
+                    forced = False
+                elif num_true[c] + num_unassigned[c] == lo:
+                    forced = True
+                else:
+                    continue
+                for v in variables:
+                    if values[v] is None:
+                        assign(v, forced)
+                        queue.extend(var_constraints[v])
+            return True
+
+        def search(next_var):
+            while next_var < self.num_vars and values[next_var] is not None:
+                next_var += 1
+            if next_var == self.num_vars:
+                return True
+
+            decisions[0] += 1
+            if self.max_decisions is not None and decisions[0] > self.max_decisions:
+                raise DecisionLimitReached()
+
+            for value in (False, True):  # mines are rare, try safe first
+                mark = len(trail)
+                assign(next_var, value)
+                if propagate(list(var_constraints[next_var])) and search(next_var + 1):
+                    return True
+                undo(mark)
+            return False
+
+        for v, value in assumptions:
+            if values[v] is not None:
+                if values[v] != value:
+                    return None
+                continue
+            assign(v, value)
+        if not propagate(list(range(len(constraints)))) or not search(0):
+            return None
+        return list(values)
+
+
+def find_forced_cells(game_state, num_mines, max_decisions=100000):
+    """
+    Decide, for every unresolved square, whether it is forced to be a mine or safe by the
+    revealed numbers and the total number of mines.
+
+    The frontier squares are variables with one exact cardinality constraint per revealed
+    number. The interior squares (not adjacent to any number) are interchangeable, so instead
+    of variables they contribute the global constraint that between
+    remaining_mines - num_interior and remaining_mines frontier squares are mines.
+    A square is forced if the solver proves the opposite value unsatisfiable; every model
+    found along the way rules out the squares whose values differ between models.
+
+    Parameters:
+    - game_state (np.ndarray): The game state (see Game).
+    - num_mines (int): Total number of mines.
+    - max_decisions (int): Decision limit per solver call. Squares whose call hits the limit are left undecided.
+
+    Returns:
+    - mines (list): (x, y) coordinates of squares forced to be mines.
+    - safe (list): (x, y) coordinates of squares forced to be safe.
+    """
+    bitboard = BitBoard.from_game_state(game_state)
+    remaining_mines = num_mines - popcount(bitboard.flagged)
+    components, interior = get_frontier_components(bitboard)
+    if components is None:
+        return [], []
+
+    # variables: the frontier squares, component by component
+    cells = []
+    constraints = []
+    for component in components:
+        offset = len(cells)
+        cells += component.cells
+        constraints += [([offset + i for i in local], target, target) for local, target in component.constraints]
+    all_vars = list(range(len(cells)))
+    constraints.append((all_vars, max(remaining_mines - len(interior), 0), remaining_mines))
+
+    solver = CardinalitySolver(len(cells), constraints, max_decisions)
+
+    def solve(*args, **kwargs):
+        try:
+            return solver.solve(*args, **kwargs)
+        except DecisionLimitReached:
+            return False
+
+    # an empty model is fine: without frontier squares, only the interior is decided below
+    model = solve()
+    if model is None or model is False:
+        return [], []
+
+    # backbone: variables with the same value in every model found so far
+    candidates = set(all_vars)
+    forced = {}
+    for v in all_vars:
+        if v not in candidates:
+            continue
+        other = solve(assumptions=[(v, not model[v])])
+        if other is None:
+            forced[v] = model[v]
+        elif other is not False:
+            candidates -= {u for u in candidates if other[u] != model[u]}
+        candidates.discard(v)
+
+    mines = [divmod(cells[v], bitboard.width) for v, value in forced.items() if value]
+    safe = [divmod(cells[v], bitboard.width) for v, value in forced.items() if not value]
+
+    # interior squares are all safe if the frontier must hold all remaining mines,
+    # and all mines if it can not hold any more than the minimum
+    if interior:
+        interior_cells = [divmod(i, bitboard.width) for i in interior]
+        if solve(extra_constraints=[(all_vars, 0, remaining_mines - 1)]) is None:
+            safe += interior_cells
+        elif solve(extra_constraints=[(all_vars, remaining_mines - len(interior) + 1, len(cells))]) is None:
+            mines += interior_cells
+
+    return mines, safe
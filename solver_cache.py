@@ -0,0 +1,125 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# number of rotations/reflections of a board
+NUM_SYMMETRIES = 8
+
+
+def transform(array, k):
+    """
+    Apply symmetry k (0..7) of the board to the last two axes of an array: a rotation by
+    k % 4 quarter turns, followed by a left-right reflection if k >= 4.
+    """
+    array = np.rot90(array, k % 4, axes=(-2, -1))
+    if k >= 4:
+        array = array[..., ::-1]
+    return array
+
+
+def inverse_transform(array, k):
+    """ Undo transform(array, k). """
+    if k >= 4:
+        array = array[..., ::-1]
+    return np.rot90(array, -(k % 4), axes=(-2, -1))
+
+
+def canonical_form(planes, symmetries=False):
+    """
+    Canonical encoding of a stack of board-shaped integer arrays (e.g. a game state, or a
+    board together with a state), as the int8 bytes of its shape and contents.
+
+    With symmetries=True, the encoding is the smallest among all rotations and reflections,
+    so that symmetric boards get the same encoding.
+
+    Returns:
+    - key (tuple): (shape, bytes) of the canonical orientation.
+    - k (int): The symmetry that maps planes to the canonical orientation (see transform).
+    """
+    planes = np.asarray(planes)
+    best = None
+    for k in range(NUM_SYMMETRIES if symmetries else 1):
+        transformed = transform(planes, k)
+        key = (transformed.shape, np.ascontiguousarray(transformed, dtype=np.int8).tobytes())
+        if best is None or key < best[0]:
+            best = (key, k)
+    return best
+
+
+class SolverCache:
+    """
+    A bounded LRU cache of solver outputs, keyed by the canonical form of the visible state
+    (see canonical_form) and the solver parameters.
+
+    Outputs are board-shaped arrays (or stacks of them). With symmetries=True, they are
+    stored in the canonical orientation and transformed back on lookup, so an output computed
+    for one board is reused for all its rotations and reflections. Note that this is only exact
+    for solvers whose results do not depend on the orientation: e.g. the naive solver tests
+    contradictions in scan order, so within max_steps it may get further in one orientation
+    than in another.
+    """
+
+    def __init__(self, max_size=100000, symmetries=False):
+        self.max_size = max_size
+        self.symmetries = symmetries
+        self.entries = OrderedDict()  # key -> output in the canonical orientation
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, planes, params=()):
+        """
+        Return a copy of the output stored for the given state and parameters, or None.
+
+        Parameters:
+        - planes (np.ndarray): The state, as one or a stack of board-shaped arrays.
+        - params (tuple): Hashable solver parameters that the output depends on.
+        """
+        key, k = canonical_form(planes, self.symmetries)
+        with self.lock:
+            value = self.entries.get((params, key))
+            if value is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.entries.move_to_end((params, key))
+        return inverse_transform(value, k).copy()
+
+    def put(self, planes, value, params=()):
+        """ Store the output for the given state and parameters (see get). """
+        key, k = canonical_form(planes, self.symmetries)
+        value = transform(np.array(value), k).copy()
+        with self.lock:
+            self.entries[(params, key)] = value
+            self.entries.move_to_end((params, key))
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def stats(self):
+        """ Number of hits, misses and entries, and the hit rate. """
+        lookups = self.hits + self.misses
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self.entries),
+                'hit_rate': self.hits / lookups if lookups else 0.0}
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+
+# cache shared by all solvers and models that are given cache=True
+shared_cache = SolverCache()
+
+
+def resolve_cache(cache):
+    """ Map a cache argument to a SolverCache: True for the shared cache, None/False for none. """
+    if cache is True:
+        return shared_cache
+    if cache is False:
+        return None
+    return cache
@@ -0,0 +1,122 @@
+import itertools
+import os
+import sys
+
+import numpy as np
+import pytest
+
+# the modules live at the top level of the repository
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+sys.path.insert(0, REPO_ROOT)
+
+from game_logic import Game
+
+# keep the game's log messages out of the test output
+Game.logging = False
+
+
+def enumerate_placements(game_state, num_mines):
+    """
+    Enumerate every placement of the unflagged mines on the unseen squares that agrees with
+    the revealed numbers. Returns the number of placements and, per unseen square, the
+    number of placements with a mine on it.
+    """
+    game_state = np.asarray(game_state)
+    unseen = [tuple(cell) for cell in np.argwhere(game_state == -1)]
+    flags = {tuple(cell) for cell in np.argwhere(game_state == -3)}
+    numbers = [(x, y, game_state[x, y]) for x, y in np.argwhere(game_state >= 0)]
+
+    counts = dict.fromkeys(unseen, 0)
+    total = 0
+    for combination in itertools.combinations(unseen, num_mines - len(flags)):
+        mines = flags | set(combination)
+        if all(sum((nx, ny) in mines for nx in range(x - 1, x + 2) for ny in range(y - 1, y + 2)) == number
+               for x, y, number in numbers):
+            total += 1
+            for cell in combination:
+                counts[cell] += 1
+    return total, counts
+
+
+def enumerate_forced_cells(game_state, num_mines):
+    """ Squares forced to be mines or safe, found with enumerate_placements. """
+    total, counts = enumerate_placements(game_state, num_mines)
+    if total == 0:
+        return set(), set()
+    return ({cell for cell, count in counts.items() if count == total},
+            {cell for cell, count in counts.items() if count == 0})
+
+
+@pytest.fixture
+def forced_cells():
+    return enumerate_forced_cells
+
+
+def random_game_states(n, length=4, width=4, num_mines=4, seed=0):
+    """ Random games with a few squares revealed and some of the mines flagged. """
+    rng = np.random.RandomState(seed)
+    for _ in range(n):
+        np.random.seed(rng.randint(2**31))
+        game = Game(length=length, width=width, num_mines=num_mines)
+        safe_squares = np.argwhere(game.game_board != -1)
+        for i in rng.choice(len(safe_squares), rng.randint(1, 4), replace=False):
+            game.reveal(*safe_squares[i])
+        mines = np.argwhere(game.game_board == -1)
+        for i in rng.choice(len(mines), rng.randint(0, num_mines), replace=False):
+            game.current_game_state[tuple(mines[i])] = -3
+        yield game
+
+
+@pytest.fixture
+def random_games():
+    return random_game_states
+
+
+def play_random_moves(game, num_moves, seed=0):
+    """ Reveal safe squares, and place and remove flags and safe marks, at random. """
+    rng = np.random.RandomState(seed)
+    for _ in range(num_moves):
+        x, y = rng.randint(game.length), rng.randint(game.width)
+        if game.current_game_state[x, y] == -1:
+            action = rng.choice([1, 2]) if game.game_board[x, y] == -1 else rng.choice([0, 1, 2])
+        elif game.current_game_state[x, y] == -3:
+            action = 1
+        elif game.current_game_state[x, y] == -4:
+            action = 2
+        else:
+            continue
+        game.move(x, y, int(action))
+    return game
+
+
+@pytest.fixture
+def played_game():
+    def make(compact_history=True, num_moves=300, seed=0, length=12, width=10, num_mines=15):
+        np.random.seed(seed)
+        game = Game(length=length, width=width, num_mines=num_mines, compact_history=compact_history)
+        return play_random_moves(game, num_moves, seed)
+    return make
+
+
+def assert_games_equal(game, other):
+    assert np.array_equal(game.game_board, other.game_board)
+    assert np.array_equal(game.current_game_state, other.current_game_state)
+    assert game.num_mines == other.num_mines
+    assert game.gameplay_enabled == other.gameplay_enabled
+    assert len(game.game_states) == len(other.game_states)
+    for game_round, other_round in zip(game.game_states, other.game_states):
+        assert game_round['move'] == other_round['move'] or list(game_round['move']) == list(other_round['move'])
+        assert np.array_equal(game_round['game_state'], other_round['game_state'])
+    assert np.array_equal(game.region_labels, other.region_labels)
+    assert np.array_equal(game.region_cells, other.region_cells)
+    assert np.array_equal(game.region_offsets, other.region_offsets)
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    """ The database module, writing to a temporary database. """
+    monkeypatch.chdir(REPO_ROOT)  # the configuration is read from ./config.json
+    import database
+    monkeypatch.setattr(database, 'DATABASE_NAME', str(tmp_path / 'test.db'))
+    database.init_db()
+    return database
@@ -0,0 +1,44 @@
+import copy
+
+import numpy as np
+
+from batch_solve import iter_solve_games, solve_game, solve_games
+from game_logic import Game
+
+
+def make_games(n, seed=0):
+    np.random.seed(seed)
+    games = []
+    for i in range(n):
+        # mixed shapes so that chunks hold games of different sizes
+        game = Game(length=6 + i % 3, width=8, num_mines=8)
+        game.make_random_move(3)
+        games.append(game)
+    return games
+
+
+def test_same_result_as_sequential_solving():
+    games = make_games(12)
+    originals = [game.current_game_state.copy() for game in games]
+    for solver_type in ['naive', 'sat', 'brute_force']:
+        steps, states = solve_games(games, solver_type=solver_type, max_workers=2, chunk_size=5)
+        assert len(steps) == len(states) == len(games)
+        for game, game_steps, state in zip(games, steps, states):
+            expected_game = copy.deepcopy(game)
+            expected_steps = solve_game(expected_game, solver_type)
+            assert np.array_equal(game_steps, expected_steps)
+            assert np.array_equal(state, expected_game.current_game_state)
+
+    # the games themselves are left unchanged
+    for game, original in zip(games, originals):
+        assert np.array_equal(game.current_game_state, original)
+
+
+def test_iter_solve_games_closed_early():
+    def games():
+        yield from make_games(6, seed=1)
+
+    results = iter_solve_games(games(), max_workers=1, chunk_size=2)
+    steps, state = next(results)
+    assert state.shape == (6, 8)
+    results.close()
@@ -0,0 +1,65 @@
+import numpy as np
+
+from bitboard import BitBoard, iterate_bits, popcount
+
+
+def random_game_state(rng, length, width):
+    """ Random array over every game state code, including revealed mines and probes. """
+    return rng.choice([-5, -4, -3, -2, -1, 0, 1, 2, 3, 8], size=(length, width))
+
+
+def test_game_state_round_trip():
+    rng = np.random.RandomState(0)
+    for length, width in [(1, 1), (3, 5), (7, 9), (16, 30)]:
+        game_state = random_game_state(rng, length, width)
+        assert np.array_equal(BitBoard.from_game_state(game_state).to_game_state(), game_state)
+
+
+def test_mask_round_trip():
+    rng = np.random.RandomState(1)
+    for length, width in [(1, 1), (3, 5), (7, 9), (16, 30)]:
+        bitboard = BitBoard(length, width)
+        array = rng.rand(length, width) < 0.3
+        mask = bitboard.to_mask(array)
+        assert np.array_equal(bitboard.to_array(mask), array.reshape(-1))
+        assert popcount(mask) == array.sum()
+        assert list(iterate_bits(mask)) == list(np.flatnonzero(array))
+        assert bitboard.cells(mask) == [tuple(cell) for cell in np.argwhere(array)]
+
+
+def test_neighbour_masks():
+    bitboard = BitBoard(4, 5)
+    for x in range(4):
+        for y in range(5):
+            expected = np.zeros((4, 5), dtype=bool)
+            expected[max(x - 1, 0):x + 2, max(y - 1, 0):y + 2] = True
+            expected[x, y] = False
+            assert bitboard.neighbour_masks[x * 5 + y] == bitboard.to_mask(expected)
+
+
+def test_frontier():
+    rng = np.random.RandomState(2)
+    for _ in range(20):
+        game_state = random_game_state(rng, 6, 7)
+        bitboard = BitBoard.from_game_state(game_state)
+        padded = np.pad(game_state > 0, 1)
+        near_number = np.zeros_like(game_state, dtype=bool)
+        for dx in range(3):
+            for dy in range(3):
+                near_number |= padded[dx:dx + 6, dy:dy + 7]
+        expected = near_number & (game_state == -1)
+        assert bitboard.frontier() == bitboard.to_mask(expected)
+
+
+def test_is_consistent(random_games):
+    for game in random_games(20, seed=4):
+        bitboard = BitBoard.from_game_state(game.current_game_state)
+        mines = bitboard.to_mask(game.game_board == -1) & ~bitboard.flagged
+        assert bitboard.is_consistent(mines)
+        revealed = list(iterate_bits(bitboard.revealed))
+        # an extra mine next to a revealed number breaks its count
+        extra = bitboard.neighbour_masks[revealed[0]] & bitboard.unknown & ~mines
+        if extra:
+            assert not bitboard.is_consistent(mines | (extra & -extra))
+        for x, y in bitboard.cells(bitboard.revealed):
+            assert bitboard.unaccounted_mines(x, y) == bitboard.count_adjacent(mines, x, y)
@@ -0,0 +1,39 @@
+import time
+
+import numpy as np
+import pytest
+
+from board_generator import forget_deductions, generate_no_guess_board, solve_from_first_click
+
+
+def test_no_guess_board_is_solvable():
+    for seed in range(5):
+        game_board = generate_no_guess_board(9, 9, 10, (4, 4), seed=seed)
+        assert np.sum(game_board == -1) == 10
+        assert np.all(game_board[3:6, 3:6] != -1)
+        game = solve_from_first_click(game_board, (4, 4))
+        assert not np.any(game.current_game_state == -1)
+
+
+def test_no_guess_respects_time_limit():
+    start = time.time()
+    with pytest.raises(ValueError):
+        # far too dense to be solvable without guessing
+        generate_no_guess_board(40, 40, 700, (20, 20), seed=0, time_limit=0.5)
+    assert time.time() - start < 1.0
+
+
+def test_forget_deductions():
+    game_state = np.array([[-3, -4, 1],
+                           [-1, -1, -1],
+                           [-1, -1, -1],
+                           [-1, -1, -4]])
+    game_board = np.array([[1, 1, 0],
+                           [-1, 1, 0],
+                           [1, 1, 0],
+                           [0, 0, 0]])
+    forgotten = forget_deductions(game_state, game_board, [(0, 0)], radius=1)
+    # marks near the changed square are removed, the revealed square gets its new number
+    assert forgotten[0, 0] == -1 and forgotten[0, 1] == -1
+    assert forgotten[0, 2] == 0
+    assert forgotten[3, 2] == -4
@@ -0,0 +1,43 @@
+import numpy as np
+
+from bitboard import BitBoard
+from brute_force import BruteForceSolver
+from game_solver import Solver
+
+
+def decided(game_state, before):
+    """ Squares flagged and marked safe in game_state that were unseen in before. """
+    mines = {tuple(cell) for cell in np.argwhere((before == -1) & (game_state == -3))}
+    safe = {tuple(cell) for cell in np.argwhere((before == -1) & (game_state == -4))}
+    return mines, safe
+
+
+def test_matches_enumeration(random_games, forced_cells):
+    for game in random_games(100, seed=1):
+        before = game.current_game_state.copy()
+        expected = forced_cells(before, game.num_mines)
+        BruteForceSolver(game).solve(max_steps=10)
+        assert decided(game.current_game_state, before) == expected
+
+
+def test_same_result_as_sat_solver(random_games):
+    for game in random_games(100, length=5, width=5, num_mines=5, seed=2):
+        before = game.current_game_state.copy()
+        sat_game_state = before.copy()
+        game.current_game_state = sat_game_state
+        Solver('sat').solve(game, max_steps=10)
+
+        game.current_game_state = before.copy()
+        BruteForceSolver(game).solve(max_steps=10)
+        assert np.array_equal(game.current_game_state, sat_game_state)
+
+
+def test_bitboard_follows_game_state(random_games):
+    for game in random_games(20, seed=3):
+        solver = BruteForceSolver(game)
+        solver.solve(max_steps=10)
+        assert solver.bitboard.flagged == BitBoard.from_game_state(game.current_game_state).flagged
+        candidates = solver.get_candidate_cells()
+        if candidates:
+            game.move(*candidates[0], 1)
+            assert solver.get_flagged_mines_count() == np.sum(game.current_game_state == -3)
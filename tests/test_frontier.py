@@ -0,0 +1,64 @@
+import itertools
+
+import numpy as np
+
+from bitboard import BitBoard, iterate_bits
+from conftest import enumerate_placements
+from frontier import FrontierComponent, binomial, consistent_rows, convolve, count_configurations, \
+    get_frontier_components
+
+
+def test_binomial_and_convolve():
+    assert [binomial(5, k) for k in range(-1, 7)] == [0, 1, 5, 10, 10, 5, 1, 0]
+    assert convolve([1, 1], [1, 1]) == [1, 2, 1]
+    assert convolve([1, 2, 1], [0, 3]) == [0, 3, 6, 3]
+
+
+def test_consistent_rows():
+    rng = np.random.RandomState(0)
+    adjacency = rng.rand(4, 6) < 0.5
+    targets = rng.randint(0, 3, size=4)
+    placements = np.array(list(itertools.product([False, True], repeat=6)))
+    expected = [all(np.sum(row & adjacency[c]) == targets[c] for c in range(4)) for row in placements]
+    assert list(consistent_rows(placements, adjacency, targets)) == expected
+
+
+def test_components_partition_unresolved_squares(random_games):
+    for game in random_games(50, length=6, width=6, num_mines=6, seed=5):
+        bitboard = BitBoard.from_game_state(game.current_game_state)
+        components, interior = get_frontier_components(bitboard)
+        squares = [i for component in components for i in component.cells] + interior
+        assert sorted(squares) == list(iterate_bits(bitboard.unknown))
+        # squares of different components share no revealed neighbour
+        for first, second in itertools.combinations(components, 2):
+            for i in iterate_bits(bitboard.revealed):
+                neighbours = set(iterate_bits(bitboard.neighbour_masks[i]))
+                assert not (neighbours & set(first.cells) and neighbours & set(second.cells))
+
+
+def test_enumerate_solutions():
+    # two squares next to a 1, the second also next to a 1 shared with a third square
+    component = FrontierComponent([10, 11, 12], [([0, 1], 1), ([1, 2], 1)])
+    solution_counts, cell_counts = component.enumerate_solutions()
+    # solutions: {11} and {10, 12}
+    assert list(solution_counts) == [0, 1, 1, 0]
+    assert [list(counts) for counts in cell_counts] == [[0, 0, 1, 0], [0, 1, 0, 0], [0, 0, 1, 0]]
+
+
+def test_count_configurations_matches_enumeration(random_games):
+    for game in random_games(100, length=5, width=5, num_mines=5, seed=6):
+        game_state = game.current_game_state
+        bitboard = BitBoard.from_game_state(game_state)
+        remaining_mines = game.num_mines - np.sum(game_state == -3)
+        total, mine_weights = count_configurations(bitboard, remaining_mines)
+
+        expected_total, counts = enumerate_placements(game_state, game.num_mines)
+        assert total == expected_total > 0
+        assert mine_weights == {x * 5 + y: count for (x, y), count in counts.items()}
+
+
+def test_count_configurations_inconsistent():
+    game_state = np.full((3, 3), -1)
+    game_state[0, 0] = 3  # only three neighbours, one of them flagged as safe
+    game_state[0, 1] = -4
+    assert count_configurations(BitBoard.from_game_state(game_state), 3) == (0, {})
@@ -0,0 +1,44 @@
+import json
+
+import numpy as np
+import pytest
+
+from conftest import assert_games_equal
+from game_history import DeltaHistory
+from game_logic import Game
+
+
+def test_matches_full_snapshots(played_game):
+    full = played_game(compact_history=False)
+    history = DeltaHistory.from_states(full.game_states, (full.length, full.width), keyframe_interval=8)
+    assert len(history) == len(full.game_states) > 16
+
+    for index in [0, 1, 7, 8, 9, len(history) - 1, -1, -len(history)]:
+        assert history[index]['move'] == full.game_states[index]['move']
+        assert np.array_equal(history[index]['game_state'], full.game_states[index]['game_state'])
+    for game_round, full_round in zip(history, full.game_states):
+        assert np.array_equal(game_round['game_state'], full_round['game_state'])
+    with pytest.raises(IndexError):
+        history[len(history)]
+
+
+def test_serialize_round_trip(played_game):
+    history = played_game().game_states
+    restored = DeltaHistory.deserialize(json.loads(json.dumps(history.serialize())))
+    assert restored.moves == [list(move) for move in history.moves]
+    assert sorted(restored.keyframes) == sorted(history.keyframes)
+    for game_round, restored_round in zip(history, restored):
+        assert np.array_equal(game_round['game_state'], restored_round['game_state'])
+    assert np.array_equal(restored.last_state, history.last_state)
+
+
+@pytest.mark.parametrize("compact_history", [False, True])
+def test_game_serialize_round_trip(played_game, compact_history):
+    game = played_game(compact_history=compact_history)
+    restored = Game.deserialize(json.loads(json.dumps(game.serialize())))
+    assert_games_equal(game, restored)
+
+    # the restored game can be played on
+    x, y = np.argwhere(game.current_game_state == -1)[0]
+    assert game.move(x, y, 1) and restored.move(x, y, 1)
+    assert_games_equal(game, restored)
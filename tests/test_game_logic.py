@@ -0,0 +1,104 @@
+import numpy as np
+import pytest
+
+from conftest import assert_games_equal
+from game_history import DeltaHistory
+from game_logic import BINARY_HEADER, BINARY_MAGIC, BINARY_VERSION, Game, generate_boards, neighbourhood_sum
+
+
+@pytest.mark.parametrize("num_mines", [91, 95, 99])
+@pytest.mark.parametrize("generation_mode", ["safe", "no_guess"])
+def test_first_click_with_high_mine_density(generation_mode, num_mines):
+    np.random.seed(0)
+    game = Game(length=10, width=10, num_mines=num_mines, generation_mode=generation_mode)
+    assert game.move(5, 5, 0)
+    assert np.sum(game.game_board == -1) == num_mines
+    assert game.game_board[5, 5] != -1
+    assert game.current_game_state[5, 5] >= 0
+
+
+def reference_reveal(game_state, game_board, x, y):
+    """ The original recursive flood fill of Game.reveal. """
+    if game_state[x, y] != -1 or game_board[x, y] == -1:
+        return
+    game_state[x, y] = game_board[x, y]
+    if game_board[x, y] == 0:
+        for nx in range(max(x - 1, 0), min(x + 2, game_state.shape[0])):
+            for ny in range(max(y - 1, 0), min(y + 2, game_state.shape[1])):
+                reference_reveal(game_state, game_board, nx, ny)
+
+
+def test_reveal_matches_flood_fill():
+    rng = np.random.RandomState(0)
+    for _ in range(300):
+        length, width = rng.randint(4, 16, size=2)
+        np.random.seed(rng.randint(2**31))
+        game = Game(length=length, width=width, num_mines=rng.randint(1, length * width // 4 + 2))
+        expected = game.current_game_state.copy()
+        for _ in range(6):
+            x, y = rng.randint(length), rng.randint(width)
+            if rng.rand() < 0.4 and expected[x, y] == -1:
+                # flag, mark safe or probe the square, which stops the cascade
+                game.current_game_state[x, y] = expected[x, y] = rng.choice([-3, -4, -5])
+            else:
+                game.reveal(x, y)
+                reference_reveal(expected, game.game_board, x, y)
+            assert np.array_equal(game.current_game_state, expected)
+
+
+@pytest.mark.parametrize("compact_history", [False, True])
+@pytest.mark.parametrize("compress", [False, True, 1])
+@pytest.mark.parametrize("include_region_index", [False, True])
+def test_binary_round_trip(played_game, compact_history, compress, include_region_index):
+    game = played_game(compact_history=compact_history)
+    data = game.to_bytes(compress=compress, include_region_index=include_region_index)
+    magic, version = BINARY_HEADER.unpack_from(data)[:2]
+    assert magic == BINARY_MAGIC and version == BINARY_VERSION == 2
+
+    restored = Game.from_bytes(data)
+    assert_games_equal(game, restored)
+    assert isinstance(restored.game_states, DeltaHistory) == compact_history
+
+    # the restored game can be played on, and encodes the same way
+    x, y = np.argwhere(game.current_game_state == -1)[0]
+    assert game.move(x, y, 1) and restored.move(x, y, 1)
+    assert_games_equal(game, restored)
+    assert restored.to_bytes(compress=compress, include_region_index=include_region_index) == \
+        game.to_bytes(compress=compress, include_region_index=include_region_index)
+
+
+@pytest.mark.parametrize("compact_history", [False, True])
+def test_binary_without_history(played_game, compact_history):
+    game = played_game(compact_history=compact_history)
+    restored = Game.from_bytes(game.to_bytes(include_history=False))
+    assert np.array_equal(restored.current_game_state, game.current_game_state)
+    assert len(restored.game_states) == 0
+
+
+def test_binary_keeps_game_status():
+    np.random.seed(0)
+    pending = Game(length=8, width=8, num_mines=10, generation_mode='no_guess')
+    restored = Game.from_bytes(pending.to_bytes())
+    assert restored.first_click_pending and restored.generation_mode == 'no_guess'
+
+    lost = Game(length=8, width=8, num_mines=10)
+    lost.move(*np.argwhere(lost.game_board == -1)[0], 0)
+    restored = Game.from_bytes(lost.to_bytes())
+    assert not restored.gameplay_enabled
+    assert np.array_equal(restored.current_game_state, lost.current_game_state)
+
+
+def test_generate_boards():
+    boards, mine_matrices = generate_boards(20, 9, 7, 12, seed=0, first_click=(0, 3))
+    assert boards.shape == mine_matrices.shape == (20, 9, 7)
+    assert np.all(mine_matrices.sum(axis=(1, 2)) == 12)
+    assert not mine_matrices[:, 0:2, 2:5].any()
+    for board, mines in zip(boards, mine_matrices):
+        assert np.array_equal(board == -1, mines)
+        numbers = neighbourhood_sum(mines) - mines
+        assert np.array_equal(board[~mines], numbers[~mines])
+
+    again, _ = generate_boards(20, 9, 7, 12, seed=0, first_click=(0, 3))
+    assert np.array_equal(boards, again)
+    with pytest.raises(ValueError):
+        generate_boards(1, 3, 3, 1, first_click=(1, 1))
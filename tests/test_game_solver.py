@@ -0,0 +1,30 @@
+import numpy as np
+import pytest
+
+from game_logic import Game
+from game_solver import Solver
+
+
+def opened_game(seed, length=16, width=16, num_mines=40):
+    """ A game with every empty region revealed. """
+    np.random.seed(seed)
+    game = Game(length=length, width=width, num_mines=num_mines)
+    for x, y in np.argwhere(game.game_board == 0):
+        game.reveal(x, y)
+    return game
+
+
+@pytest.mark.parametrize("contradiction_depth", [1, 2])
+def test_naive_solver_is_sound(contradiction_depth):
+    for seed in range(20):
+        game = opened_game(seed)
+        before = game.current_game_state.copy()
+        steps = Solver('naive').solve(game, max_steps=100, contradiction_depth=contradiction_depth)
+
+        state = game.current_game_state
+        assert np.all(game.game_board[state == -3] == -1)
+        assert np.all(game.game_board[state == -4] != -1)
+        # every decided square got the step it was decided in
+        decided = (before == -1) & (state != -1)
+        assert np.all(steps[decided] > 0)
+        assert np.all(steps[(before == -1) & ~decided] == 0)
@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+from conftest import assert_games_equal
+
+
+@pytest.fixture
+def stores(database):
+    from game_store import create_game_store
+    return create_game_store('memory', max_games=2), create_game_store('sqlite')
+
+
+def test_save_and_get(stores, played_game):
+    for store in stores:
+        game = played_game()
+        game_id = store.add(game)
+        assert_games_equal(store.get(game_id), game)
+
+        x, y = np.argwhere(game.current_game_state == -1)[0]
+        game.move(x, y, 1)
+        store.save(game_id, game)
+        assert_games_equal(store.get(game_id), game)
+
+        store.delete(game_id)
+        assert store.get(game_id) is None
+        assert store.get(None) is None
+
+
+def test_memory_store_evicts_least_recently_used(stores, played_game):
+    store = stores[0]
+    first, second = store.add(played_game(seed=1)), store.add(played_game(seed=2))
+    store.get(first)
+    third = store.add(played_game(seed=3))
+    assert store.get(second) is None
+    assert store.get(first) is not None and store.get(third) is not None
+
+
+def test_expiry(database, played_game):
+    from game_store import create_game_store
+    for store_type in ['memory', 'sqlite']:
+        store = create_game_store(store_type, ttl=-1)
+        assert store.get(store.add(played_game())) is None
+
+    with pytest.raises(NotImplementedError):
+        create_game_store('redis')
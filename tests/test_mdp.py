@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+
+from mdp import MCTS, Grid, MineSweeper, eliminate, mcts, vi
+
+BOARDS = [
+    (np.array([[1, 2, 1], [-1, -1, -1]]), 1, 2, 2),
+    (np.array([[1, 1, 1, 1, 1], [1, -1, -1, -1, -1]]), 1, 4, 2),
+    (np.array([[1, 2, 2, 1], [-1, -1, -1, -1], [1, 2, 2, 1]]), 1, 3, 2),
+]
+
+
+def initial_state(board):
+    s = board.copy()
+    s[s != -1] = 0
+    return s
+
+
+def test_eliminate():
+    # a + b = 1, b = 1  ->  a = 0, b = 1; c is unconstrained
+    assert eliminate(3, (((0, 1), 1), ((1,), 1))) == (0, 1, -1)
+    # a + b + c = 3  ->  all mines
+    assert eliminate(3, (((0, 1, 2), 3),)) == (1, 1, 1)
+
+
+def test_mcts_prefers_moves_towards_the_goal():
+    grid = Grid(3, 3)
+    Q, N = mcts(grid, (0, 0), max_iter=300, max_depth=6, seed=0)
+    q = Q[(0, 0)]
+    # right and down lead towards the goal, left and up bump into the wall
+    assert min(q[0], q[2]) > max(q[1], q[3])
+
+
+def test_mcts_reuses_tree():
+    grid = Grid(3, 3)
+    tree = MCTS(grid, max_depth=6, seed=0)
+    _, N = mcts(grid, (0, 0), max_iter=50, tree=tree)
+    visits = N[(0, 0)].sum()
+    _, N = mcts(grid, (0, 0), max_iter=50, tree=tree)
+    assert N[(0, 0)].sum() > visits
+
+    with pytest.raises(ValueError):
+        mcts(grid, (0, 0), max_iter=10, workers=2, tree=tree)
+
+
+def test_rollouts_update_leaf():
+    grid = Grid(3, 3)
+    tree = MCTS(grid, max_depth=4, rollouts=8, seed=0)
+    tree.search((0, 0), max_iter=1)
+    q, n = tree.root_values((0, 0))
+    assert n.sum() == 8
+    assert np.all(q <= 1)
+
+
+@pytest.mark.parametrize("board, x, y, n_mines", BOARDS)
+def test_value_iteration_methods_agree(board, x, y, n_mines):
+    mdp = MineSweeper(board, x, y, n_mines)
+    states = mdp.traverse(initial_state(board))
+    Q, V = vi(mdp, states, rtol=1e-9, method="topological")
+    for method in ["sweep", "prioritized"]:
+        other_Q, other_V = vi(mdp, states, rtol=1e-9, method=method)
+        for name in V:
+            assert np.isclose(other_V[name], V[name])
+            assert np.allclose(other_Q[name], Q[name])
+
+    with pytest.raises(ValueError):
+        vi(mdp, states, method="unknown")
+
+
+@pytest.mark.parametrize("board, x, y, n_mines", BOARDS)
+def test_parallel_traverse_finds_the_same_states(board, x, y, n_mines):
+    mdp = MineSweeper(board, x, y, n_mines)
+    s = initial_state(board)
+    states = mdp.traverse(s)
+    parallel_states = mdp.traverse(s, workers=2, chunk_size=2)
+    assert len(parallel_states) == len(states)
+    assert {mdp.hash(state) for state in parallel_states} == {mdp.hash(state) for state in states}
+    # the breadth-first order does not depend on the number of workers
+    assert [mdp.hash(state) for state in mdp.traverse(s, workers=3, chunk_size=1)] == \
+        [mdp.hash(state) for state in parallel_states]
@@ -0,0 +1,32 @@
+import numpy as np
+
+from conftest import enumerate_placements
+from probability import mine_probabilities
+
+
+def test_matches_enumeration(random_games):
+    for game in random_games(100, length=5, width=5, num_mines=5, seed=7):
+        game_state = game.current_game_state
+        probabilities = mine_probabilities(game_state, game.num_mines)
+
+        total, counts = enumerate_placements(game_state, game.num_mines)
+        for cell, count in counts.items():
+            assert np.isclose(probabilities[cell], count / total)
+        assert np.all(probabilities[game_state == -3] == 1)
+        assert np.all(probabilities[game_state >= 0] == 0)
+        assert np.isclose(probabilities.sum(), game.num_mines)
+
+
+def test_mines_never_have_zero_probability(random_games):
+    for game in random_games(50, length=6, width=6, num_mines=7, seed=8):
+        probabilities = mine_probabilities(game.current_game_state, game.num_mines)
+        assert np.all(probabilities[game.game_board == -1] > 0)
+
+
+def test_inconsistent_game_state():
+    game_state = np.full((3, 3), -1)
+    game_state[1, 1] = 2
+    game_state[0, 0] = -4
+    probabilities = mine_probabilities(game_state, 1)
+    assert np.isnan(probabilities[game_state == -1]).all()
+    assert probabilities[1, 1] == 0 and probabilities[0, 0] == 0
@@ -0,0 +1,25 @@
+import pytest
+
+pytest.importorskip('flask')
+
+
+@pytest.fixture
+def client(database):
+    from app import app
+    return app.test_client()
+
+
+@pytest.mark.parametrize("store_type", ['memory', 'sqlite'])
+@pytest.mark.parametrize("generation_mode", ['safe', 'no_guess', 'unknown'])
+def test_first_click_with_high_mine_density(client, monkeypatch, store_type, generation_mode):
+    import routes
+    from game_store import create_game_store
+    monkeypatch.setattr(routes, 'game_store', create_game_store(store_type))
+
+    response = client.post('/game', data={'length': 10, 'width': 10, 'mines': 95,
+                                          'generation_mode': generation_mode})
+    assert response.status_code == 200
+    response = client.post('/move', json={'x': 5, 'y': 5, 'action': 0, 'time': 0})
+    assert response.status_code == 200
+    assert response.json['result'] is not False
+    assert response.json['game_state'][5][5] >= 0
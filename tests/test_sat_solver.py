@@ -0,0 +1,31 @@
+import numpy as np
+
+from sat_solver import CardinalitySolver, find_forced_cells
+
+
+def test_cardinality_solver():
+    # exactly one of 0, 1 and exactly one of 1, 2, with 0 true
+    solver = CardinalitySolver(3, [([0, 1], 1, 1), ([1, 2], 1, 1)])
+    assert solver.solve(assumptions=[(0, True)]) == [True, False, True]
+    assert solver.solve(assumptions=[(0, True), (2, False)]) is None
+
+
+def test_interior_decided_without_frontier():
+    # every mine is flagged and no number is revealed, so there are no frontier squares
+    game_state = np.full((3, 4), -1)
+    game_state[0, 0] = -3
+    mines, safe = find_forced_cells(game_state, 1)
+    assert mines == []
+    assert sorted(safe) == [(x, y) for x in range(3) for y in range(4) if (x, y) != (0, 0)]
+
+    # no mine is flagged and only the mines are unseen
+    game_state = np.full((2, 2), -1)
+    mines, safe = find_forced_cells(game_state, 4)
+    assert sorted(mines) == [(0, 0), (0, 1), (1, 0), (1, 1)]
+    assert safe == []
+
+
+def test_matches_enumeration(random_games, forced_cells):
+    for game in random_games(200):
+        mines, safe = find_forced_cells(game.current_game_state, game.num_mines)
+        assert (set(mines), set(safe)) == forced_cells(game.current_game_state, game.num_mines)
@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+from brute_force import BruteForceSolver
+from game_logic import Game
+from game_solver import Solver
+from solver_cache import SolverCache, canonical_form, inverse_transform, transform
+
+
+def copy_game(game):
+    return Game(game_board=game.game_board.copy(),
+                game_states=[{'move': None, 'game_state': game.current_game_state.copy()}])
+
+
+def solve(game, solver_type, cache):
+    if solver_type == 'brute_force':
+        return BruteForceSolver(game, cache=cache).solve(max_steps=10)
+    return Solver(solver_type, cache=cache).solve(game, max_steps=10)
+
+
+def test_lru_bound_and_stats():
+    cache = SolverCache(max_size=2)
+    states = [np.full((3, 3), value) for value in range(3)]
+    for state in states:
+        cache.put(state, state * 2)
+    assert len(cache) == 2
+    assert cache.get(states[0]) is None
+    assert np.array_equal(cache.get(states[2]), states[2] * 2)
+    assert cache.stats() == {'hits': 1, 'misses': 1, 'size': 2, 'hit_rate': 0.5}
+
+
+def test_symmetries():
+    state = np.arange(12).reshape(3, 4) % 5 - 1
+    for k in range(8):
+        assert np.array_equal(inverse_transform(transform(state, k), k), state)
+        assert canonical_form(transform(state, k), symmetries=True)[0] == canonical_form(state, symmetries=True)[0]
+
+    cache = SolverCache(symmetries=True)
+    cache.put(state, state * 3)
+    rotated = transform(state, 1)
+    assert np.array_equal(cache.get(rotated), rotated * 3)
+
+
+@pytest.mark.parametrize("solver_type", ['naive', 'sat', 'brute_force'])
+def test_hit_equals_miss(random_games, solver_type):
+    probes_decided = 0
+    for game in random_games(60, seed=4):
+        # turn an unseen square into a probe, which moves can not change
+        unseen = np.argwhere(game.current_game_state == -1)
+        probe = tuple(unseen[len(unseen) // 2])
+        game.current_game_state[probe] = -5
+
+        cache = SolverCache()
+        missed, hit = game, copy_game(game)
+        missed_steps = solve(missed, solver_type, cache)
+        hit_steps = solve(hit, solver_type, cache)
+        assert cache.hits == 1
+
+        assert np.array_equal(hit_steps, missed_steps)
+        assert np.array_equal(hit.current_game_state, missed.current_game_state)
+        probes_decided += missed.current_game_state[probe] != -5
+    if solver_type == 'brute_force':
+        assert probes_decided > 0